@@ -17,20 +17,151 @@ from mitmproxy import http, ctx
 from mitmproxy.tools.main import mitmdump
 import urllib.parse
 import re
+import threading
+import queue
+import time
+import logging
+import logging.handlers
 from datetime import datetime
 import json
 import sys
 
 DB_PATH = 'network_activity.db'
 
+# Schema creation runs once per process, not once per addon construction
+_SCHEMA_READY = False
+
+# Per-flow log lines go through a queue to a background listener so the
+# flow hooks never block on stdio writes
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+log = logging.getLogger('https_interceptor')
+log.setLevel(logging.INFO)
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+log.propagate = False
+
+# Insert statements by table, kept at module scope so SQLite prepares each
+# once and the writer can bind whole batches with executemany
+INSERT_SQL = {
+    'urls_visited': '''
+        INSERT INTO urls_visited (device_id, source_ip, url, full_url, method, status_code)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''',
+    'search_queries': '''
+        INSERT INTO search_queries (device_id, source_ip, search_engine, query)
+        VALUES (?, ?, ?, ?)
+    ''',
+    'form_submissions': '''
+        INSERT INTO form_submissions (device_id, source_ip, url, form_data)
+        VALUES (?, ?, ?, ?)
+    ''',
+}
+
+# Static assets carry no browsing signal; skip them before any DB work
+STATIC_EXTENSIONS = ('.js', '.css', '.png', '.jpg', '.jpeg', '.gif',
+                     '.woff', '.woff2', '.svg', '.ico')
+STATIC_CONTENT_TYPES = ('image/', 'font/', 'text/css')
+
+# Applied once per connection; WAL keeps writers from fsyncing every INSERT
+# and lets the viewers read while the proxy writes
+DB_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'temp_store=MEMORY',
+    'cache_size=-16000',
+    'mmap_size=268435456',
+)
+
 class HTTPSInterceptor:
+    # Single alternation regex: engine detection and query extraction in
+    # one pass over the URL, with the matched group named after the engine.
+    # Class-level so the addon being constructed twice (module import plus
+    # main()) compiles it once.
+    _search_re = re.compile(
+        r'(?:duckduckgo\.[^/]*/[^#]*[?&]q=(?P<duckduckgo>[^&]+))'
+        r'|(?:google\.[^/]*/[^#]*[?&]q=(?P<google>[^&]+))'
+        r'|(?:bing\.[^/]*/[^#]*[?&]q=(?P<bing>[^&]+))'
+        r'|(?:yahoo\.[^/]*/[^#]*[?&]p=(?P<yahoo>[^&]+))'
+        r'|(?:yandex\.[^/]*/[^#]*[?&]text=(?P<yandex>[^&]+))'
+        r'|(?:baidu\.[^/]*/[^#]*[?&]wd=(?P<baidu>[^&]+))',
+        re.IGNORECASE
+    )
+
+    # Field names whose values must never be stored (passwords, etc.)
+    _sensitive_re = re.compile(
+        r'password|passwd|pwd|pass|secret|token|key', re.IGNORECASE)
+
     def __init__(self):
+        # One long-lived connection for all flows; mitmproxy may call hooks
+        # from different threads, so serialize access with a lock
+        self.conn = sqlite3.connect(DB_PATH, check_same_thread=False,
+                                    isolation_level=None)
+        for pragma in DB_PRAGMAS:
+            self.conn.execute(f'PRAGMA {pragma}')
+        self._lock = threading.Lock()
+        # IP -> device id; stable for the lifetime of a DHCP lease, so a
+        # dict lookup replaces a SELECT per flow once populated
+        self._device_cache = {}
         self.init_database()
 
+        # Flows only enqueue rows; a single writer thread drains the queue
+        # and commits them in batches so N inserts cost one transaction
+        self._write_queue = queue.Queue(maxsize=10000)
+        self._dropped_writes = 0
+        writer = threading.Thread(target=self._writer_loop, daemon=True)
+        writer.start()
+
+    def _enqueue_write(self, table, row):
+        """Queue a row for the background writer, dropping on overflow"""
+        try:
+            self._write_queue.put_nowait((table, row))
+        except queue.Full:
+            self._dropped_writes += 1
+
+    def _writer_loop(self):
+        """Drain queued rows and write them in batched transactions"""
+        while True:
+            try:
+                batch = [self._write_queue.get(timeout=1)]
+            except queue.Empty:
+                continue
+
+            # Collect up to 500 rows or 50 ms worth, whichever comes first
+            deadline = time.monotonic() + 0.05
+            while len(batch) < 500:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Group rows by table so each table gets one executemany call
+            rows_by_table = {}
+            for table, row in batch:
+                rows_by_table.setdefault(table, []).append(row)
+
+            try:
+                with self._lock:
+                    self.conn.execute('BEGIN IMMEDIATE')
+                    try:
+                        for table, rows in rows_by_table.items():
+                            self.conn.executemany(INSERT_SQL[table], rows)
+                        self.conn.execute('COMMIT')
+                    except Exception:
+                        self.conn.execute('ROLLBACK')
+                        raise
+            except Exception as e:
+                ctx.log.error(f"Error writing batch: {e}")
+
     def init_database(self):
         """Add tables for HTTPS traffic interception"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        global _SCHEMA_READY
+        if _SCHEMA_READY:
+            return
+        cursor = self.conn.cursor()
 
         # URLs visited table
         cursor.execute('''
@@ -73,48 +204,73 @@ class HTTPSInterceptor:
             )
         ''')
 
+        # Hour-bucket column (epoch/3600): integer compares in the index
+        # beat datetime string compares for the viewers' range predicates
+        cursor.execute("SELECT COUNT(*) FROM pragma_table_info('urls_visited') WHERE name = 'hbucket'")
+        if not cursor.fetchone()[0]:
+            cursor.execute('ALTER TABLE urls_visited ADD COLUMN hbucket INTEGER')
+            cursor.execute('''
+                UPDATE urls_visited
+                SET hbucket = CAST(strftime('%s', timestamp) AS INTEGER) / 3600
+                WHERE hbucket IS NULL
+            ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_uv_hbucket
+            AFTER INSERT ON urls_visited
+            BEGIN
+                UPDATE urls_visited
+                SET hbucket = CAST(strftime('%s', NEW.timestamp) AS INTEGER) / 3600
+                WHERE id = NEW.id;
+            END
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_uv_hb ON urls_visited(device_id, hbucket DESC)')
+
         # Create indexes
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_urls_timestamp ON urls_visited(timestamp)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_urls_device ON urls_visited(device_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_search_timestamp ON search_queries(timestamp)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_search_device ON search_queries(device_id)')
 
-        conn.commit()
-        conn.close()
+        _SCHEMA_READY = True
         ctx.log.info("[✓] HTTPS Interceptor database initialized")
 
     def get_device_id(self, ip_address):
         """Get device ID from IP address"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM devices WHERE ip_address = ?', (ip_address,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else None
-
-    def extract_search_query(self, url, host):
+        device_id = self._device_cache.get(ip_address)
+        if device_id is not None:
+            return device_id
+
+        with self._lock:
+            cursor = self.conn.execute('SELECT id FROM devices WHERE ip_address = ?', (ip_address,))
+            result = cursor.fetchone()
+
+        if result:
+            self._device_cache[ip_address] = result[0]
+            return result[0]
+        return None
+
+    def extract_search_query(self, url):
         """Extract search queries from URLs"""
-        search_engines = {
-            'google': r'[?&]q=([^&]+)',
-            'bing': r'[?&]q=([^&]+)',
-            'yahoo': r'[?&]p=([^&]+)',
-            'duckduckgo': r'[?&]q=([^&]+)',
-            'yandex': r'[?&]text=([^&]+)',
-            'baidu': r'[?&]wd=([^&]+)',
-        }
-
-        for engine, pattern in search_engines.items():
-            if engine in host.lower():
-                match = re.search(pattern, url)
-                if match:
-                    query = urllib.parse.unquote_plus(match.group(1))
-                    return engine, query
+        match = self._search_re.search(url)
+        if match:
+            engine = match.lastgroup
+            query = urllib.parse.unquote_plus(match.group(engine))
+            return engine, query
 
         return None, None
 
     def log_url(self, flow: http.HTTPFlow):
         """Log visited URL"""
         try:
+            # Skip static assets (images, CSS, fonts, scripts)
+            if flow.response:
+                content_type = flow.response.headers.get('content-type', '')
+                if (content_type.startswith(STATIC_CONTENT_TYPES)
+                        or content_type in ('application/javascript', 'application/font-woff2')):
+                    return
+            if flow.request.path.split('?', 1)[0].lower().endswith(STATIC_EXTENSIONS):
+                return
+
             source_ip = flow.client_conn.peername[0]
             url = flow.request.pretty_url
             host = flow.request.pretty_host
@@ -125,30 +281,21 @@ class HTTPSInterceptor:
             device_id = self.get_device_id(source_ip)
 
             # Check for search query
-            search_engine, query = self.extract_search_query(url, host)
-
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
+            search_engine, query = self.extract_search_query(url)
 
             # Log the URL
-            cursor.execute('''
-                INSERT INTO urls_visited (device_id, source_ip, url, full_url, method, status_code)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (device_id, source_ip, host, url, method, status_code))
+            self._enqueue_write('urls_visited',
+                                (device_id, source_ip, host, url, method, status_code))
 
             # If it's a search query, log it separately
             if query:
-                cursor.execute('''
-                    INSERT INTO search_queries (device_id, source_ip, search_engine, query)
-                    VALUES (?, ?, ?, ?)
-                ''', (device_id, source_ip, search_engine, query))
+                self._enqueue_write('search_queries',
+                                    (device_id, source_ip, search_engine, query))
 
-                ctx.log.info(f"[SEARCH] {source_ip} -> {search_engine}: {query}")
+            if query:
+                log.info("[SEARCH] %s -> %s: %s", source_ip, search_engine, query)
             else:
-                ctx.log.info(f"[URL] {source_ip} -> {method} {host}")
-
-            conn.commit()
-            conn.close()
+                log.info("[URL] %s -> %s %s", source_ip, method, host)
 
         except Exception as e:
             ctx.log.error(f"Error logging URL: {e}")
@@ -168,27 +315,17 @@ class HTTPSInterceptor:
                         form_data = flow.request.urlencoded_form
                         if form_data:
                             # Filter out sensitive data (passwords, etc.)
-                            filtered_data = {}
-                            sensitive_fields = ['password', 'passwd', 'pwd', 'pass', 'secret', 'token', 'key']
-
-                            for key, value in form_data.items():
-                                if any(sensitive in key.lower() for sensitive in sensitive_fields):
-                                    filtered_data[key] = "[REDACTED]"
-                                else:
-                                    filtered_data[key] = value
+                            filtered_data = {
+                                key: "[REDACTED]" if self._sensitive_re.search(key) else value
+                                for key, value in form_data.items()
+                            }
 
                             device_id = self.get_device_id(source_ip)
 
-                            conn = sqlite3.connect(DB_PATH)
-                            cursor = conn.cursor()
-                            cursor.execute('''
-                                INSERT INTO form_submissions (device_id, source_ip, url, form_data)
-                                VALUES (?, ?, ?, ?)
-                            ''', (device_id, source_ip, url, json.dumps(filtered_data)))
-                            conn.commit()
-                            conn.close()
+                            self._enqueue_write('form_submissions',
+                                                (device_id, source_ip, url, json.dumps(filtered_data)))
 
-                            ctx.log.info(f"[FORM] {source_ip} -> POST to {url}")
+                            log.info("[FORM] %s -> POST to %s", source_ip, url)
                     except:
                         pass  # Not form data or couldn't decode
 
@@ -229,8 +366,7 @@ def main():
     Certificate will be available at: http://mitm.it
     """)
 
-    # Initialize database
-    interceptor = HTTPSInterceptor()
+    # The database is already initialized by the addon constructed at import
 
     print("[*] Run mitmproxy with:")
     print("    mitmproxy -s https_interceptor.py")
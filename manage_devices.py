@@ -87,20 +87,19 @@ def show_status():
         print("DETECTED DEVICES ON NETWORK")
         print("-"*80)
 
-        table_data = []
-        for dev in devices:
-            # Check if device is in interested list
-            status = "✓ MONITORED" if dev['mac_address'] in config['interested_devices'] else ""
-            if config['monitor_all_devices']:
-                status = "✓ MONITORED (ALL)"
-
-            table_data.append([
-                dev['mac_address'],
-                dev['ip_address'] or 'N/A',
-                dev['query_count'],
-                dev['last_seen'],
-                status
-            ])
+        # Set membership instead of scanning the config list per device
+        interested = set(config['interested_devices'])
+        all_mode = config['monitor_all_devices']
+
+        table_data = [
+            [dev['mac_address'],
+             dev['ip_address'] or 'N/A',
+             dev['query_count'],
+             dev['last_seen'],
+             "✓ MONITORED (ALL)" if all_mode
+             else ("✓ MONITORED" if dev['mac_address'] in interested else "")]
+            for dev in devices
+        ]
 
         print(tabulate(table_data,
                       headers=['MAC Address', 'IP Address', 'Queries', 'Last Seen', 'Status'],
@@ -178,17 +177,16 @@ def add_device_interactive():
     print("="*80)
 
     config = load_config()
-
-    table_data = []
-    for i, dev in enumerate(devices, 1):
-        status = "Already monitored" if dev['mac_address'] in config['interested_devices'] else ""
-        table_data.append([
-            i,
-            dev['mac_address'],
-            dev['ip_address'] or 'N/A',
-            dev['query_count'],
-            status
-        ])
+    interested = set(config['interested_devices'])
+
+    table_data = [
+        [i,
+         dev['mac_address'],
+         dev['ip_address'] or 'N/A',
+         dev['query_count'],
+         "Already monitored" if dev['mac_address'] in interested else ""]
+        for i, dev in enumerate(devices, 1)
+    ]
 
     print(tabulate(table_data,
                   headers=['#', 'MAC Address', 'IP Address', 'Queries', 'Status'],
@@ -8,59 +8,224 @@ import sqlite3
 import datetime
 from scapy.all import sniff, DNS, DNSQR, IP, Ether
 from scapy.layers.inet import TCP, UDP
+import argparse
 import threading
 import signal
+import socket
+import struct
 import sys
+import time
+import queue
 import json
 import os
 from collections import defaultdict
 
+# scapy only needs layers up to L4 (plus DNS over UDP); stop it from
+# guessing higher-layer payloads on every TCP packet
+TCP.payload_guess = []
+
+# Destination ports treated as web traffic
+WEB_PORTS = frozenset((80, 443, 8080, 8443))
+
+# DNS query-type names; anything else is stored numerically
+QTYPE_MAP = {1: 'A', 28: 'AAAA', 5: 'CNAME', 15: 'MX', 16: 'TXT',
+             33: 'SRV', 65: 'HTTPS'}
+
+# WAL lets query_history/scan_network read while the monitor writes, and
+# synchronous=NORMAL stops every insert from forcing an fsync
+DB_PRAGMAS = (
+    # auto_vacuum must be set before the first table is created; on an
+    # already-populated database it only takes effect after a VACUUM
+    'auto_vacuum=INCREMENTAL',
+    'journal_mode=WAL',
+    'journal_size_limit=67108864',
+    'synchronous=NORMAL',
+    'busy_timeout=5000',
+    'temp_store=MEMORY',
+    'cache_size=-20000',
+    'mmap_size=268435456',
+)
+
+
+# Module-level SQL constants so the writer always binds against the
+# same cached prepared statements
+_INSERT_SQL = {
+    'dns_queries': '''
+        INSERT INTO dns_queries (device_id, source_ip, query_name, query_type, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+    ''',
+    'connections': '''
+        INSERT INTO connections (device_id, source_ip, dest_ip, dest_port, protocol, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''',
+}
+
+
+def _is_private_ip(ip_int):
+    """RFC1918 check on a 32-bit big-endian IP"""
+    return ((ip_int & 0xFF000000) == 0x0A000000        # 10/8
+            or (ip_int & 0xFFF00000) == 0xAC100000     # 172.16/12
+            or (ip_int & 0xFFFF0000) == 0xC0A80000)    # 192.168/16
+
+
+# Classic BPF program: IPv4, proto UDP or TCP, not a fragment, and a
+# destination port of 53 or one of WEB_PORTS. Attached with
+# SO_ATTACH_FILTER so the kernel drops everything else before the frame
+# is copied to userspace; _handle_raw_frame still validates each field.
+_SO_ATTACH_FILTER = 26
+_BPF_FILTER = (
+    (0x28, 0, 0, 12),        # ldh  [12]               ethertype
+    (0x15, 0, 13, 0x0800),   # jeq  0x0800, else drop
+    (0x30, 0, 0, 23),        # ldb  [23]               IP protocol
+    (0x15, 1, 0, 17),        # jeq  UDP
+    (0x15, 0, 10, 6),        # jeq  TCP, else drop
+    (0x28, 0, 0, 20),        # ldh  [20]               fragment offset
+    (0x45, 8, 0, 0x1FFF),    # jset -> drop (no L4 header in fragments)
+    (0xB1, 0, 0, 14),        # ldxb 4*([14]&0xf)       IHL
+    (0x48, 0, 0, 16),        # ldh  [x+16]             destination port
+    (0x15, 4, 0, 53),
+    (0x15, 3, 0, 80),
+    (0x15, 2, 0, 443),
+    (0x15, 1, 0, 8080),
+    (0x15, 0, 1, 8443),
+    (0x06, 0, 0, 0x40000),   # ret  accept
+    (0x06, 0, 0, 0),         # ret  drop
+)
+
+
 class NetworkMonitor:
-    def __init__(self, db_path='network_activity.db', config_path='device_filter.json'):
+    def __init__(self, db_path='network_activity.db', config_path='device_filter.json',
+                 verbose=False):
         self.db_path = db_path
         self.config_path = config_path
+        # Per-packet prints flush line-buffered stdout and can cap
+        # throughput on a busy network, so they are opt-in
+        self.verbose = verbose
         self.running = True
         self.device_cache = {}
         self.filter_config = self.load_filter_config()
+        # One long-lived connection instead of one per packet; capture and
+        # worker threads share it behind a lock
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                    isolation_level=None, cached_statements=128)
+        for pragma in DB_PRAGMAS:
+            self.conn.execute(f'PRAGMA {pragma}')
+        self._db_lock = threading.Lock()
         self.init_database()
 
+        # Packet handlers enqueue rows; one writer thread flushes them in
+        # batched transactions so a packet storm costs one commit per batch
+        self._write_queue = queue.Queue(maxsize=10000)
+        self._dropped_writes = 0
+        writer = threading.Thread(target=self._writer_loop, daemon=True)
+        writer.start()
+
+        # The capture thread only enqueues frames; dissection and logging
+        # run on this worker so slow processing can't back up the kernel
+        # ring buffer and drop packets
+        self._raw_queue = queue.Queue(maxsize=50000)
+        self._dropped_packets = 0
+        dissector = threading.Thread(target=self._dissect_loop, daemon=True)
+        dissector.start()
+
+        # Return freed pages to the filesystem a chunk at a time instead
+        # of letting the file grow forever or stalling on a full VACUUM
+        vacuum = threading.Thread(target=self._vacuum_loop, daemon=True)
+        vacuum.start()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def _enqueue_write(self, table, row):
+        """Queue a row for the background writer, dropping on overflow"""
+        try:
+            self._write_queue.put_nowait((table, row))
+        except queue.Full:
+            self._dropped_writes += 1
+
+    def _writer_loop(self):
+        """Drain queued rows and write them in batched transactions"""
+        while True:
+            try:
+                batch = [self._write_queue.get(timeout=1)]
+            except queue.Empty:
+                continue
+
+            # Collect up to 500 rows or 200 ms worth, whichever comes first
+            deadline = time.monotonic() + 0.2
+            while len(batch) < 500:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Stamp the batch once in Python (CURRENT_TIMESTAMP reads the
+            # clock per row) and bind each table's rows in one executemany
+            now = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+            rows_by_table = defaultdict(list)
+            for table, row in batch:
+                rows_by_table[table].append((*row, now))
+
+            try:
+                with self._db_lock:
+                    self.conn.execute('BEGIN IMMEDIATE')
+                    try:
+                        for table, rows in rows_by_table.items():
+                            self.conn.executemany(_INSERT_SQL[table], rows)
+                        self.conn.execute('COMMIT')
+                    except Exception:
+                        self.conn.execute('ROLLBACK')
+                        raise
+            except Exception as e:
+                print(f"[!] Error writing batch: {e}")
+
+    def _vacuum_loop(self):
+        """Reclaim freelist pages every 15 minutes"""
+        while True:
+            time.sleep(900)
+            try:
+                with self._db_lock:
+                    self.conn.execute('PRAGMA incremental_vacuum(2048)')
+            except Exception as e:
+                print(f"[!] Error during incremental vacuum: {e}")
+
     def load_filter_config(self):
         """Load device filter configuration"""
         if not os.path.exists(self.config_path):
             # Create default config
-            default_config = {
+            config = {
                 "monitor_all_devices": True,
                 "interested_devices": [],
                 "description": "Add MAC addresses of devices you want to monitor. Set monitor_all_devices to false to enable filtering."
             }
             with open(self.config_path, 'w') as f:
-                json.dump(default_config, f, indent=2)
-            return default_config
+                json.dump(config, f, indent=2)
+        else:
+            try:
+                with open(self.config_path, 'r') as f:
+                    config = json.load(f)
+            except Exception as e:
+                print(f"[!] Error loading config: {e}")
+                config = {"monitor_all_devices": True, "interested_devices": []}
 
-        try:
-            with open(self.config_path, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[!] Error loading config: {e}")
-            return {"monitor_all_devices": True, "interested_devices": []}
+        # Normalize the filter once so the per-packet check is a set probe
+        self._monitor_all = config.get('monitor_all_devices', True)
+        self._interested_macs = frozenset(
+            mac.upper().strip() for mac in config.get('interested_devices', []))
+
+        return config
 
     def is_device_allowed(self, mac_address):
         """Check if device should be monitored based on filter config"""
-        # If monitoring all devices, allow everything
-        if self.filter_config.get('monitor_all_devices', True):
-            return True
-
-        # Normalize MAC address for comparison
-        mac_normalized = mac_address.upper().strip()
-
-        # Check if device is in interested list
-        interested_devices = [mac.upper().strip() for mac in self.filter_config.get('interested_devices', [])]
-        return mac_normalized in interested_devices
+        return self._monitor_all or mac_address.upper() in self._interested_macs
 
     def init_database(self):
         """Initialize SQLite database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
 
         # Devices table
         cursor.execute('''
@@ -103,140 +268,261 @@ class NetworkMonitor:
 
         # Create indexes for faster queries
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_dns_timestamp ON dns_queries(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_dns_device ON dns_queries(device_id)')
+        # Covering index so per-device COUNT(DISTINCT id) aggregations scan
+        # the index only, never the table
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_dns_device_id ON dns_queries(device_id, id)')
+        # Covering index for top-domain aggregation over a time window
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_dns_ts_name ON dns_queries(timestamp, query_name)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_conn_timestamp ON connections(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_conn_device ON connections(device_id)')
+        # Composite indexes so per-device history reads come back already
+        # ordered by time — no filesort before LIMIT. Their leading column
+        # makes the old single-column device indexes redundant.
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_dns_device_ts ON dns_queries(device_id, timestamp DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_conn_device_ts ON connections(device_id, timestamp DESC)')
+        cursor.execute('DROP INDEX IF EXISTS idx_dns_device')
+        cursor.execute('DROP INDEX IF EXISTS idx_conn_device')
 
-        conn.commit()
-        conn.close()
         print(f"[✓] Database initialized: {self.db_path}")
 
     def get_or_create_device(self, mac_address, ip_address):
         """Get existing device or create new one"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT id FROM devices WHERE mac_address = ?', (mac_address,))
-        result = cursor.fetchone()
-
-        if result:
-            device_id = result[0]
-            # Update last seen and IP if changed
-            cursor.execute('''
-                UPDATE devices
-                SET last_seen = CURRENT_TIMESTAMP, ip_address = ?
-                WHERE id = ?
-            ''', (ip_address, device_id))
-        else:
-            cursor.execute('''
+        # Known devices dominate, so serve the id from memory and only
+        # refresh last_seen/ip_address in the database once a minute
+        now = time.monotonic()
+        cached = self.device_cache.get(mac_address)
+        if cached is not None and now - cached[1] < 60:
+            return cached[0]
+
+        # Single upsert instead of SELECT then UPDATE/INSERT; the UNIQUE
+        # constraint on mac_address makes ON CONFLICT target it directly.
+        # first_seen = last_seen only holds for a fresh insert.
+        with self._db_lock:
+            cursor = self.conn.execute('''
                 INSERT INTO devices (mac_address, ip_address)
                 VALUES (?, ?)
+                ON CONFLICT(mac_address) DO UPDATE
+                SET last_seen = CURRENT_TIMESTAMP, ip_address = excluded.ip_address
+                RETURNING id, first_seen = last_seen
             ''', (mac_address, ip_address))
-            device_id = cursor.lastrowid
+            device_id, is_new = cursor.fetchone()
+
+        self.device_cache[mac_address] = (device_id, now)
+
+        if is_new:
             print(f"[+] New device detected: {mac_address} ({ip_address})")
 
-        conn.commit()
-        conn.close()
         return device_id
 
-    def log_dns_query(self, packet):
-        """Log DNS query to database"""
-        try:
-            if packet.haslayer(DNSQR):
-                dns_query = packet[DNSQR]
-                query_name = dns_query.qname.decode('utf-8', errors='ignore').rstrip('.')
+    def _record_dns(self, mac_address, source_ip, query_name, qtype):
+        """Store a DNS query once the fields are extracted"""
+        # Check if device is allowed
+        if not self.is_device_allowed(mac_address):
+            return
 
-                # Get source IP and MAC
-                source_ip = packet[IP].src if packet.haslayer(IP) else 'Unknown'
-                mac_address = packet[Ether].src if packet.haslayer(Ether) else 'Unknown'
+        # Get or create device
+        device_id = self.get_or_create_device(mac_address, source_ip)
 
-                # Check if device is allowed
-                if not self.is_device_allowed(mac_address):
-                    return
+        # Get query type; A records dominate, so skip the lookup for them
+        query_type = 'A' if qtype == 1 else QTYPE_MAP.get(qtype) or str(qtype)
+
+        # Insert DNS query
+        self._enqueue_write('dns_queries',
+                            (device_id, source_ip, query_name, query_type))
+
+        if self.verbose:
+            print(f"[DNS] {source_ip} ({mac_address[:17]}) -> {query_name}")
+
+    def _record_connection(self, mac_address, source_ip, dest_ip, dest_port, protocol):
+        """Store a web connection; callers have already filtered ports/subnets"""
+        # Check if device is allowed
+        if not self.is_device_allowed(mac_address):
+            return
 
-                # Get or create device
-                device_id = self.get_or_create_device(mac_address, source_ip)
+        device_id = self.get_or_create_device(mac_address, source_ip)
 
-                # Get query type
-                qtype_map = {1: 'A', 28: 'AAAA', 5: 'CNAME', 15: 'MX', 16: 'TXT'}
-                query_type = qtype_map.get(dns_query.qtype, str(dns_query.qtype))
+        # Insert connection
+        self._enqueue_write('connections',
+                            (device_id, source_ip, dest_ip, dest_port, protocol))
 
-                # Insert DNS query
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO dns_queries (device_id, source_ip, query_name, query_type)
-                    VALUES (?, ?, ?, ?)
-                ''', (device_id, source_ip, query_name, query_type))
-                conn.commit()
-                conn.close()
+        if self.verbose:
+            print(f"[{protocol}] {source_ip} -> {dest_ip}:{dest_port}")
 
-                print(f"[DNS] {source_ip} ({mac_address[:17]}) -> {query_name}")
+    def log_dns_query(self, dnsqr, ip, eth):
+        """Log DNS query to database"""
+        try:
+            # DNS labels are ASCII; slicing off the root dot before decoding
+            # builds one string instead of decode + rstrip
+            qname = dnsqr.qname
+            if qname.endswith(b'.'):
+                qname = qname[:-1]
+            query_name = qname.decode('ascii', errors='ignore')
+
+            # Get source IP and MAC
+            source_ip = ip.src if ip is not None else 'Unknown'
+            mac_address = eth.src if eth is not None else 'Unknown'
+
+            self._record_dns(mac_address, source_ip, query_name, dnsqr.qtype)
 
         except Exception as e:
             print(f"[!] Error logging DNS query: {e}")
 
-    def log_connection(self, packet):
+    def log_connection(self, ip, eth, tcp, udp):
         """Log HTTP/HTTPS connection attempts"""
         try:
-            if packet.haslayer(IP) and (packet.haslayer(TCP) or packet.haslayer(UDP)):
-                source_ip = packet[IP].src
-                dest_ip = packet[IP].dst
-
-                # Get MAC address
-                mac_address = packet[Ether].src if packet.haslayer(Ether) else 'Unknown'
-
-                # Check if device is allowed
-                if not self.is_device_allowed(mac_address):
+            source_ip = ip.src
+            dest_ip = ip.dst
+
+            # Get MAC address
+            mac_address = eth.src if eth is not None else 'Unknown'
+
+            # Only log outbound connections (from local network); same
+            # integer mask check the raw path uses, and it covers all of
+            # 172.16/12 where the old prefix check only matched 172.16.
+            if not _is_private_ip(int.from_bytes(socket.inet_aton(source_ip), 'big')):
+                return
+
+            if tcp is not None:
+                dest_port = tcp.dport
+                protocol = 'TCP'
+                # Only log common web ports
+                if dest_port not in WEB_PORTS:
                     return
-
-                # Only log outbound connections (from local network)
-                if not source_ip.startswith(('192.168.', '10.', '172.16.')):
+            elif udp is not None:
+                dest_port = udp.dport
+                protocol = 'UDP'
+                # Skip DNS (already logged separately)
+                if dest_port == 53:
                     return
+            else:
+                return
 
-                # Get port and protocol
-                if packet.haslayer(TCP):
-                    dest_port = packet[TCP].dport
-                    protocol = 'TCP'
-                    # Only log common web ports
-                    if dest_port not in [80, 443, 8080, 8443]:
-                        return
-                else:
-                    dest_port = packet[UDP].dport
-                    protocol = 'UDP'
-                    # Skip DNS (already logged separately)
-                    if dest_port == 53:
-                        return
-
-                device_id = self.get_or_create_device(mac_address, source_ip)
-
-                # Insert connection
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO connections (device_id, source_ip, dest_ip, dest_port, protocol)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (device_id, source_ip, dest_ip, dest_port, protocol))
-                conn.commit()
-                conn.close()
-
-                print(f"[{protocol}] {source_ip} -> {dest_ip}:{dest_port}")
+            self._record_connection(mac_address, source_ip, dest_ip, dest_port, protocol)
 
         except Exception as e:
             print(f"[!] Error logging connection: {e}")
 
     def packet_handler(self, packet):
-        """Main packet handler"""
+        """Capture callback: hand the packet to the dissect worker"""
+        try:
+            self._raw_queue.put_nowait(packet)
+        except queue.Full:
+            self._dropped_packets += 1
+
+    def _dissect_loop(self):
+        """Drain captured frames and dissect them off the capture thread"""
+        while True:
+            pkt = self._raw_queue.get()
+            try:
+                if isinstance(pkt, bytes):
+                    self._handle_raw_frame(pkt)
+                else:
+                    self._dissect_packet(pkt)
+            except Exception as e:
+                print(f"[!] Error handling packet: {e}")
+
+    def _dissect_packet(self, packet, _Ether=Ether, _IP=IP, _UDP=UDP,
+                        _TCP=TCP, _DNS=DNS):
+        """Dissect a scapy packet and log anything interesting"""
+        # The layer classes are bound as defaults so the per-packet
+        # lookups are LOAD_FAST instead of LOAD_GLOBAL
         try:
-            # Log DNS queries
-            if packet.haslayer(DNS) and packet.haslayer(DNSQR):
-                self.log_dns_query(packet)
+            # Walk the layer chain once via payload links; each getlayer
+            # call would re-walk the dissection tree
+            eth = packet.getlayer(_Ether)
+            ip = eth.payload if eth is not None else packet.getlayer(_IP)
+            if not isinstance(ip, _IP):
+                return
+            l4 = ip.payload
+
+            if isinstance(l4, _UDP):
+                dns = l4.payload
+                # Log DNS queries (qd is the first question record)
+                if isinstance(dns, _DNS) and dns.qd is not None:
+                    self.log_dns_query(dns.qd, ip, eth)
+                else:
+                    self.log_connection(ip, eth, None, l4)
             # Log web connections
-            elif packet.haslayer(IP):
-                self.log_connection(packet)
+            elif isinstance(l4, _TCP):
+                self.log_connection(ip, eth, l4, None)
         except Exception as e:
             print(f"[!] Error handling packet: {e}")
 
+    @staticmethod
+    def _parse_qname(frame, offset):
+        """Read a wire-format DNS QNAME (length-prefixed labels)"""
+        labels = []
+        end = len(frame)
+        while offset < end:
+            length = frame[offset]
+            if length == 0 or length >= 0xC0:  # root label or compression pointer
+                break
+            offset += 1
+            labels.append(frame[offset:offset + length])
+            offset += length
+        return b'.'.join(labels).decode('ascii', errors='ignore'), offset
+
+    def _handle_raw_frame(self, frame):
+        """Parse an Ethernet frame with struct instead of scapy layers"""
+        # Ethernet(14) + minimal IPv4(20) header
+        if len(frame) < 34 or frame[12:14] != b'\x08\x00':
+            return
+
+        ihl = (frame[14] & 0x0F) * 4
+        proto = frame[23]
+        l4_offset = 14 + ihl
+        if len(frame) < l4_offset + 8:
+            return
+
+        mac_address = frame[6:12].hex(':')
+        source_ip = socket.inet_ntoa(frame[26:30])
+        dest_ip = socket.inet_ntoa(frame[30:34])
+        sport, dport = struct.unpack_from('!HH', frame, l4_offset)
+
+        if proto == 17:  # UDP
+            if dport != 53:
+                return
+            # DNS header is 12 bytes; low QR bit means it's a query
+            dns_offset = l4_offset + 8
+            if len(frame) < dns_offset + 13 or frame[dns_offset + 2] & 0x80:
+                return
+            query_name, qname_end = self._parse_qname(frame, dns_offset + 12)
+            if not query_name or len(frame) < qname_end + 3:
+                return
+            qtype = struct.unpack_from('!H', frame, qname_end + 1)[0]
+            self._record_dns(mac_address, source_ip, query_name, qtype)
+        elif proto == 6:  # TCP
+            # Branchless integer masks instead of string prefix checks
+            if dport in WEB_PORTS and _is_private_ip(int.from_bytes(frame[26:30], 'big')):
+                self._record_connection(mac_address, source_ip, dest_ip, dport, 'TCP')
+
+    def _sniff_raw(self, interface=None):
+        """Capture with a raw AF_PACKET socket (Linux fast path)"""
+        ETH_P_ALL = 0x0003
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        if interface:
+            sock.bind((interface, 0))
+
+        # Push the port filter into the kernel; if the filter can't be
+        # attached we just see every frame and filter in Python as before
+        try:
+            import ctypes
+            insns = b''.join(struct.pack('HBBI', *insn) for insn in _BPF_FILTER)
+            buf = ctypes.create_string_buffer(insns)
+            prog = struct.pack('HL', len(_BPF_FILTER), ctypes.addressof(buf))
+            sock.setsockopt(socket.SOL_SOCKET, _SO_ATTACH_FILTER, prog)
+        except OSError as e:
+            print(f"[!] Could not attach BPF filter ({e}), filtering in Python")
+
+        try:
+            while self.running:
+                frame = sock.recv(65535)
+                try:
+                    self._raw_queue.put_nowait(frame)
+                except queue.Full:
+                    self._dropped_packets += 1
+        finally:
+            sock.close()
+
     def start_monitoring(self, interface=None):
         """Start packet capture"""
         print(f"\n{'='*60}")
@@ -259,10 +545,30 @@ class NetworkMonitor:
         print("[*] Press Ctrl+C to stop\n")
 
         try:
-            # Capture DNS (UDP port 53) and web traffic (TCP ports 80, 443)
+            # Prefer the raw AF_PACKET socket on Linux: struct-based header
+            # parsing avoids building a scapy object per packet. Elsewhere
+            # (or if raw sockets are unavailable) fall back to scapy.
+            if hasattr(socket, 'AF_PACKET'):
+                try:
+                    self._sniff_raw(interface)
+                    return
+                except PermissionError:
+                    raise
+                except OSError as e:
+                    print(f"[!] Raw capture unavailable ({e}), falling back to scapy")
+
+            # Capture DNS (UDP port 53) and web traffic (TCP ports 80, 443).
+            # When filtering is on, push the MAC filter into BPF so the
+            # kernel drops other devices' packets before scapy sees them.
+            bpf_filter = "udp port 53 or tcp port 80 or tcp port 443"
+            if not self._monitor_all and self._interested_macs:
+                mac_filter = " or ".join(
+                    f"ether src {mac}" for mac in sorted(self._interested_macs))
+                bpf_filter = f"({mac_filter}) and ({bpf_filter})"
+
             # Enable promiscuous mode to capture all packets on the network
             sniff(
-                filter="udp port 53 or tcp port 80 or tcp port 443",
+                filter=bpf_filter,
                 prn=self.packet_handler,
                 iface=interface,
                 store=False,
@@ -280,8 +586,16 @@ class NetworkMonitor:
         except Exception as e:
             print(f"\n[!] Error: {e}")
             sys.exit(1)
+        finally:
+            self.close()
 
 def main():
+    parser = argparse.ArgumentParser(
+        description='Monitor DNS queries and web connections from devices on your network')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                       help='Print each DNS query and connection as it is logged')
+    args = parser.parse_args()
+
     print("""
     ╔═══════════════════════════════════════════════════════════╗
     ║         Network Activity Monitor v1.0                     ║
@@ -291,7 +605,7 @@ def main():
 
     print("[*] TIP: Not seeing all devices? Run 'python scan_network.py' to discover all devices on your network\n")
 
-    monitor = NetworkMonitor()
+    monitor = NetworkMonitor(verbose=args.verbose)
 
     # Handle Ctrl+C gracefully
     def signal_handler(sig, frame):
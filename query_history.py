@@ -10,10 +10,24 @@ from tabulate import tabulate
 
 DB_PATH = 'network_activity.db'
 
+def time_cutoff(hours):
+    """Cutoff timestamp for an hours-ago window, in SQLite's UTC format.
+
+    Binding a plain value keeps `timestamp >= ?` an index range seek;
+    datetime('now', ...) inside the WHERE clause can defeat that.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    return cutoff.strftime('%Y-%m-%d %H:%M:%S')
+
 def get_db_connection():
     """Get database connection"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        # Read-only role: the monitor owns the single writer connection,
+        # so this tool never competes for the WAL write slot
+        conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True)
+        # Wait out monitor checkpoints instead of failing with "locked"
+        conn.execute('PRAGMA busy_timeout=5000')
+        conn.execute('PRAGMA query_only=1')
         conn.row_factory = sqlite3.Row
         return conn
     except sqlite3.Error as e:
@@ -25,42 +39,39 @@ def list_devices():
     conn = get_db_connection()
     cursor = conn.cursor()
 
+    # Two index-only queries instead of a join + COUNT(DISTINCT) that
+    # scans the whole dns_queries table
     cursor.execute('''
-        SELECT
-            d.id,
-            d.mac_address,
-            d.ip_address,
-            d.first_seen,
-            d.last_seen,
-            COUNT(DISTINCT dq.id) as query_count
-        FROM devices d
-        LEFT JOIN dns_queries dq ON d.id = dq.device_id
-        GROUP BY d.id
-        ORDER BY d.last_seen DESC
+        SELECT id, mac_address, ip_address, last_seen
+        FROM devices
+        ORDER BY last_seen DESC
     ''')
-
     rows = cursor.fetchall()
     if not rows:
         print("\n[*] No devices found")
         conn.close()
         return
 
-    table_data = []
-    for row in rows:
-        table_data.append([
-            row['id'],
-            row['mac_address'],
-            row['ip_address'] or 'N/A',
-            row['query_count'],
-            row['last_seen']
-        ])
+    cursor.execute('SELECT device_id, COUNT(*) FROM dns_queries GROUP BY device_id')
+    query_counts = dict(cursor.fetchall())
+
+    # Build rows in one pass; numparse is pointless here and costs a
+    # float/int parse attempt per cell
+    table_data = [
+        [row['id'],
+         row['mac_address'],
+         row['ip_address'] or 'N/A',
+         query_counts.get(row['id'], 0),
+         row['last_seen']]
+        for row in rows
+    ]
 
     print("\n" + "="*80)
     print("DEVICES ON NETWORK")
     print("="*80)
     print(tabulate(table_data,
                    headers=['ID', 'MAC Address', 'IP Address', 'Queries', 'Last Seen'],
-                   tablefmt='grid'))
+                   tablefmt='grid', disable_numparse=True))
     print()
 
     conn.close()
@@ -83,31 +94,28 @@ def show_device_activity(device_id, hours=24, limit=50):
     print(f"DEVICE ACTIVITY: {device['mac_address']} ({device['ip_address'] or 'N/A'})")
     print("="*80)
 
+    cutoff = time_cutoff(hours)
+
     # Get DNS queries
     cursor.execute('''
         SELECT query_name, query_type, timestamp
         FROM dns_queries
         WHERE device_id = ?
-        AND timestamp >= datetime('now', '-' || ? || ' hours')
+        AND timestamp >= ?
         ORDER BY timestamp DESC
         LIMIT ?
-    ''', (device_id, hours, limit))
+    ''', (device_id, cutoff, limit))
 
     queries = cursor.fetchall()
 
     if queries:
         print(f"\nDNS Queries (last {hours} hours):")
         print("-" * 80)
-        table_data = []
-        for q in queries:
-            table_data.append([
-                q['query_name'],
-                q['query_type'],
-                q['timestamp']
-            ])
+        table_data = [[q['query_name'], q['query_type'], q['timestamp']]
+                      for q in queries]
         print(tabulate(table_data,
                       headers=['Domain', 'Type', 'Timestamp'],
-                      tablefmt='grid'))
+                      tablefmt='grid', disable_numparse=True))
     else:
         print(f"\n[*] No DNS queries in the last {hours} hours")
 
@@ -116,27 +124,21 @@ def show_device_activity(device_id, hours=24, limit=50):
         SELECT dest_ip, dest_port, protocol, timestamp
         FROM connections
         WHERE device_id = ?
-        AND timestamp >= datetime('now', '-' || ? || ' hours')
+        AND timestamp >= ?
         ORDER BY timestamp DESC
         LIMIT ?
-    ''', (device_id, hours, limit))
+    ''', (device_id, cutoff, limit))
 
     connections = cursor.fetchall()
 
     if connections:
         print(f"\n\nConnections (last {hours} hours):")
         print("-" * 80)
-        table_data = []
-        for c in connections:
-            table_data.append([
-                c['dest_ip'],
-                c['dest_port'],
-                c['protocol'],
-                c['timestamp']
-            ])
+        table_data = [[c['dest_ip'], c['dest_port'], c['protocol'], c['timestamp']]
+                      for c in connections]
         print(tabulate(table_data,
                       headers=['Destination IP', 'Port', 'Protocol', 'Timestamp'],
-                      tablefmt='grid'))
+                      tablefmt='grid', disable_numparse=True))
     else:
         print(f"\n[*] No connections in the last {hours} hours")
 
@@ -172,18 +174,14 @@ def search_queries(search_term, limit=50):
     print(f"SEARCH RESULTS: '{search_term}'")
     print("="*80)
 
-    table_data = []
-    for r in results:
-        table_data.append([
-            r['mac_address'],
-            r['ip_address'] or 'N/A',
-            r['query_name'],
-            r['timestamp']
-        ])
+    table_data = [
+        [r['mac_address'], r['ip_address'] or 'N/A', r['query_name'], r['timestamp']]
+        for r in results
+    ]
 
     print(tabulate(table_data,
                   headers=['MAC Address', 'IP Address', 'Domain', 'Timestamp'],
-                  tablefmt='grid'))
+                  tablefmt='grid', disable_numparse=True))
     print()
 
     conn.close()
@@ -196,11 +194,11 @@ def show_top_domains(hours=24, limit=20):
     cursor.execute('''
         SELECT query_name, COUNT(*) as count
         FROM dns_queries
-        WHERE timestamp >= datetime('now', '-' || ? || ' hours')
+        WHERE timestamp >= ?
         GROUP BY query_name
         ORDER BY count DESC
         LIMIT ?
-    ''', (hours, limit))
+    ''', (time_cutoff(hours), limit))
 
     results = cursor.fetchall()
 
@@ -213,16 +211,11 @@ def show_top_domains(hours=24, limit=20):
     print(f"TOP DOMAINS (last {hours} hours)")
     print("="*80)
 
-    table_data = []
-    for r in results:
-        table_data.append([
-            r['query_name'],
-            r['count']
-        ])
+    table_data = [[r['query_name'], r['count']] for r in results]
 
     print(tabulate(table_data,
                   headers=['Domain', 'Query Count'],
-                  tablefmt='grid'))
+                  tablefmt='grid', disable_numparse=True))
     print()
 
     conn.close()
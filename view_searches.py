@@ -6,37 +6,228 @@ Display Google searches, URLs visited, and user behavior
 
 import sqlite3
 import argparse
+import time
 from tabulate import tabulate
 from datetime import datetime, timedelta
 import urllib.parse
 
 DB_PATH = 'network_activity.db'
 
+def hour_bucket_cutoff(hours):
+    """Integer hour bucket (epoch/3600) for an hours-ago window"""
+    return int(time.time() // 3600) - hours
+
+def time_cutoff(hours):
+    """Cutoff timestamp for an hours-ago window, in SQLite's UTC format.
+
+    Binding a plain value keeps `timestamp >= ?` an index range seek;
+    datetime('now', ...) inside the WHERE clause can defeat that.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    return cutoff.strftime('%Y-%m-%d %H:%M:%S')
+
+# WAL reads don't block the capture side's writes, and the bigger cache
+# keeps the timestamp B-trees memory-resident across view_* calls
+DB_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'busy_timeout=5000',
+    'cache_size=-16384',
+    'temp_store=MEMORY',
+    'mmap_size=268435456',
+)
+
+# Base queries as module constants: every invocation builds the same
+# few strings, so SQLite's statement cache gets hits instead of parses
+# The devices table is tiny and slow-changing, so the activity queries
+# skip the LEFT JOIN and device names are resolved from a dict instead
+SEARCH_SQL = '''
+    SELECT
+        sq.search_engine,
+        sq.query,
+        sq.timestamp,
+        sq.source_ip,
+        sq.device_id
+    FROM search_queries sq
+    WHERE sq.timestamp >= ?
+'''
+
+HISTORY_SQL = '''
+    SELECT
+        uv.url,
+        uv.full_url,
+        uv.method,
+        uv.status_code,
+        uv.timestamp,
+        uv.source_ip,
+        uv.device_id
+    FROM urls_visited uv
+    WHERE uv.hbucket >= ?
+'''
+
+# Fallback for databases written before the hbucket migration ran
+HISTORY_SQL_TS = '''
+    SELECT
+        uv.url,
+        uv.full_url,
+        uv.method,
+        uv.status_code,
+        uv.timestamp,
+        uv.source_ip,
+        uv.device_id
+    FROM urls_visited uv
+    WHERE uv.timestamp >= ?
+'''
+
+FORMS_SQL = '''
+    SELECT
+        fs.url,
+        fs.form_data,
+        fs.timestamp,
+        fs.source_ip,
+        fs.device_id
+    FROM form_submissions fs
+    WHERE fs.timestamp >= ?
+'''
+
+# No INDEXED BY pin: the planner picks idx_uv_url on its own once it
+# exists, and the query still prepares if index creation failed (e.g.
+# read-only database)
+TOP_SITES_SQL = '''
+    SELECT
+        url,
+        COUNT(*) as visit_count
+    FROM urls_visited
+    WHERE hbucket >= ?
+'''
+
+TOP_SITES_SQL_TS = '''
+    SELECT
+        url,
+        COUNT(*) as visit_count
+    FROM urls_visited
+    WHERE timestamp >= ?
+'''
+
+# Above this many rows, tabulate's grid borders cost more than the data
+TABULATE_ROW_LIMIT = 200
+
+def print_table(table_data, headers, maxcolwidths=None):
+    """Grid rendering for small tables, plain columns for large dumps"""
+    if len(table_data) <= TABULATE_ROW_LIMIT:
+        print(tabulate(table_data, headers=headers, tablefmt='grid',
+                      maxcolwidths=maxcolwidths))
+        return
+
+    # One width pass plus one format per row; no per-cell wrapping or
+    # border drawing
+    str_rows = [[str(cell) for cell in row] for row in table_data]
+    widths = [len(str(h)) for h in headers]
+    for row in str_rows:
+        for i, cell in enumerate(row):
+            if len(cell) > widths[i]:
+                widths[i] = len(cell)
+
+    fmt = '  '.join(f'{{:<{w}}}' for w in widths)
+    print(fmt.format(*headers))
+    print('-' * (sum(widths) + 2 * (len(widths) - 1)))
+    for row in str_rows:
+        print(fmt.format(*row))
+
+_conn = None
+
+# True once urls_visited actually has the hbucket column; databases from
+# older interceptor versions fall back to the timestamp predicate
+_has_hbucket = False
+
+def _ensure_schema(conn):
+    """Create the indexes and hbucket column the view queries rely on"""
+    global _has_hbucket
+    try:
+        # (device_id, timestamp DESC) matches the filter + ORDER BY of
+        # every per-device view; idx_uv_url serves the top-sites GROUP BY
+        index_ddl = (
+            ('idx_sq_dev_ts', 'CREATE INDEX idx_sq_dev_ts ON search_queries(device_id, timestamp DESC)'),
+            ('idx_uv_dev_ts', 'CREATE INDEX idx_uv_dev_ts ON urls_visited(device_id, timestamp DESC)'),
+            ('idx_fs_dev_ts', 'CREATE INDEX idx_fs_dev_ts ON form_submissions(device_id, timestamp DESC)'),
+            ('idx_uv_url', 'CREATE INDEX idx_uv_url ON urls_visited(url)'),
+        )
+        existing = {row[0] for row in
+                    conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        created = False
+        for name, ddl in index_ddl:
+            if name not in existing:
+                conn.execute(ddl)
+                created = True
+
+        # Same idempotent migration the interceptor runs, so viewing an
+        # older capture database doesn't depend on the new interceptor
+        # having started first
+        cursor = conn.execute("SELECT COUNT(*) FROM pragma_table_info('urls_visited') WHERE name = 'hbucket'")
+        if not cursor.fetchone()[0]:
+            conn.execute('ALTER TABLE urls_visited ADD COLUMN hbucket INTEGER')
+            conn.execute('''
+                UPDATE urls_visited
+                SET hbucket = CAST(strftime('%s', timestamp) AS INTEGER) / 3600
+                WHERE hbucket IS NULL
+            ''')
+            created = True
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_uv_hbucket
+            AFTER INSERT ON urls_visited
+            BEGIN
+                UPDATE urls_visited
+                SET hbucket = CAST(strftime('%s', NEW.timestamp) AS INTEGER) / 3600
+                WHERE id = NEW.id;
+            END
+        ''')
+        if 'idx_uv_hb' not in existing:
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_uv_hb ON urls_visited(device_id, hbucket DESC)')
+            created = True
+
+        # ANALYZE rescans every index in the database; only worth it when
+        # something above actually changed, not on every CLI invocation
+        if created:
+            conn.execute('ANALYZE')
+        conn.commit()
+    except sqlite3.Error:
+        # Tables don't exist until the interceptor has captured something,
+        # or the database is read-only/locked; the views fall back below
+        pass
+
+    try:
+        _has_hbucket = bool(conn.execute(
+            "SELECT COUNT(*) FROM pragma_table_info('urls_visited') WHERE name = 'hbucket'"
+        ).fetchone()[0])
+    except sqlite3.Error:
+        _has_hbucket = False
+
+def get_device_names(conn):
+    """Map device_id -> display name for Python-side resolution"""
+    try:
+        return {row['id']: row['hostname'] or row['mac_address'][:17]
+                for row in conn.execute('SELECT id, mac_address, hostname FROM devices')}
+    except sqlite3.Error:
+        return {}
+
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get the shared database connection (opened once per run)"""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_PATH)
+        for pragma in DB_PRAGMAS:
+            _conn.execute(f'PRAGMA {pragma}')
+        _conn.row_factory = sqlite3.Row
+        _ensure_schema(_conn)
+    return _conn
 
 def view_search_history(device_id=None, hours=24, search_engine=None, limit=100):
     """View search query history"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    query = '''
-        SELECT
-            sq.search_engine,
-            sq.query,
-            sq.timestamp,
-            sq.source_ip,
-            d.mac_address,
-            d.hostname
-        FROM search_queries sq
-        LEFT JOIN devices d ON sq.device_id = d.id
-        WHERE sq.timestamp >= datetime('now', '-' || ? || ' hours')
-    '''
-
-    params = [hours]
+    query = SEARCH_SQL
+    params = [time_cutoff(hours)]
 
     if device_id:
         query += ' AND sq.device_id = ?'
@@ -49,11 +240,22 @@ def view_search_history(device_id=None, hours=24, search_engine=None, limit=100)
     query += ' ORDER BY sq.timestamp DESC LIMIT ?'
     params.append(limit)
 
+    # Iterate the cursor directly; fetchall would hold the full result
+    # set and the display list in memory at once
+    device_names = get_device_names(conn)
+    cursor.arraysize = 1000
     cursor.execute(query, params)
-    results = cursor.fetchall()
-    conn.close()
 
-    if not results:
+    table_data = [
+        [row['timestamp'],
+         device_names.get(row['device_id'], 'Unknown'),
+         row['source_ip'],
+         row['search_engine'].upper(),
+         row['query']]
+        for row in cursor
+    ]
+
+    if not table_data:
         print(f"\n[*] No search queries found in the last {hours} hours")
         return
 
@@ -61,20 +263,9 @@ def view_search_history(device_id=None, hours=24, search_engine=None, limit=100)
     print(f"SEARCH QUERY HISTORY (Last {hours} hours)")
     print(f"{'='*100}\n")
 
-    table_data = []
-    for row in results:
-        table_data.append([
-            row['timestamp'],
-            row['hostname'] or row['mac_address'][:17],
-            row['source_ip'],
-            row['search_engine'].upper(),
-            row['query']
-        ])
-
-    print(tabulate(table_data,
-                  headers=['Time', 'Device', 'IP', 'Engine', 'Search Query'],
-                  tablefmt='grid',
-                  maxcolwidths=[None, 20, 15, 10, 60]))
+    print_table(table_data,
+                headers=['Time', 'Device', 'IP', 'Engine', 'Search Query'],
+                maxcolwidths=[None, 20, 15, 10, 60])
     print()
 
 def view_browsing_history(device_id=None, hours=24, limit=100):
@@ -82,22 +273,12 @@ def view_browsing_history(device_id=None, hours=24, limit=100):
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    query = '''
-        SELECT
-            uv.url,
-            uv.full_url,
-            uv.method,
-            uv.status_code,
-            uv.timestamp,
-            uv.source_ip,
-            d.mac_address,
-            d.hostname
-        FROM urls_visited uv
-        LEFT JOIN devices d ON uv.device_id = d.id
-        WHERE uv.timestamp >= datetime('now', '-' || ? || ' hours')
-    '''
-
-    params = [hours]
+    if _has_hbucket:
+        query = HISTORY_SQL
+        params = [hour_bucket_cutoff(hours)]
+    else:
+        query = HISTORY_SQL_TS
+        params = [time_cutoff(hours)]
 
     if device_id:
         query += ' AND uv.device_id = ?'
@@ -106,35 +287,34 @@ def view_browsing_history(device_id=None, hours=24, limit=100):
     query += ' ORDER BY uv.timestamp DESC LIMIT ?'
     params.append(limit)
 
+    device_names = get_device_names(conn)
+    cursor.arraysize = 1000
     cursor.execute(query, params)
-    results = cursor.fetchall()
-    conn.close()
-
-    if not results:
-        print(f"\n[*] No browsing history found in the last {hours} hours")
-        return
-
-    print(f"\n{'='*120}")
-    print(f"BROWSING HISTORY (Last {hours} hours)")
-    print(f"{'='*120}\n")
 
     table_data = []
-    for row in results:
+    for row in cursor:
         # Truncate URL if too long
         url_display = row['url'][:50] + '...' if len(row['url']) > 50 else row['url']
 
         table_data.append([
             row['timestamp'],
-            row['hostname'] or row['mac_address'][:17],
+            device_names.get(row['device_id'], 'Unknown'),
             row['method'],
             row['status_code'] or 'N/A',
             url_display
         ])
 
-    print(tabulate(table_data,
-                  headers=['Time', 'Device', 'Method', 'Status', 'URL'],
-                  tablefmt='grid',
-                  maxcolwidths=[None, 20, 8, 8, 70]))
+    if not table_data:
+        print(f"\n[*] No browsing history found in the last {hours} hours")
+        return
+
+    print(f"\n{'='*120}")
+    print(f"BROWSING HISTORY (Last {hours} hours)")
+    print(f"{'='*120}\n")
+
+    print_table(table_data,
+                headers=['Time', 'Device', 'Method', 'Status', 'URL'],
+                maxcolwidths=[None, 20, 8, 8, 70])
     print()
 
 def view_form_submissions(device_id=None, hours=24, limit=50):
@@ -142,20 +322,8 @@ def view_form_submissions(device_id=None, hours=24, limit=50):
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    query = '''
-        SELECT
-            fs.url,
-            fs.form_data,
-            fs.timestamp,
-            fs.source_ip,
-            d.mac_address,
-            d.hostname
-        FROM form_submissions fs
-        LEFT JOIN devices d ON fs.device_id = d.id
-        WHERE fs.timestamp >= datetime('now', '-' || ? || ' hours')
-    '''
-
-    params = [hours]
+    query = FORMS_SQL
+    params = [time_cutoff(hours)]
 
     if device_id:
         query += ' AND fs.device_id = ?'
@@ -164,11 +332,12 @@ def view_form_submissions(device_id=None, hours=24, limit=50):
     query += ' ORDER BY fs.timestamp DESC LIMIT ?'
     params.append(limit)
 
+    device_names = get_device_names(conn)
     cursor.execute(query, params)
-    results = cursor.fetchall()
-    conn.close()
 
-    if not results:
+    # Stream rows as they arrive; peek one to handle the empty case
+    row = cursor.fetchone()
+    if row is None:
         print(f"\n[*] No form submissions found in the last {hours} hours")
         return
 
@@ -176,28 +345,26 @@ def view_form_submissions(device_id=None, hours=24, limit=50):
     print(f"FORM SUBMISSIONS (Last {hours} hours)")
     print(f"{'='*100}\n")
 
-    for row in results:
+    while row is not None:
         print(f"Time: {row['timestamp']}")
-        print(f"Device: {row['hostname'] or row['mac_address'][:17]} ({row['source_ip']})")
+        print(f"Device: {device_names.get(row['device_id'], 'Unknown')} ({row['source_ip']})")
         print(f"URL: {row['url']}")
         print(f"Data: {row['form_data']}")
         print("-" * 100)
         print()
+        row = cursor.fetchone()
 
 def view_top_sites(device_id=None, hours=24, limit=20):
     """View most visited sites"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    query = '''
-        SELECT
-            url,
-            COUNT(*) as visit_count
-        FROM urls_visited
-        WHERE timestamp >= datetime('now', '-' || ? || ' hours')
-    '''
-
-    params = [hours]
+    if _has_hbucket:
+        query = TOP_SITES_SQL
+        params = [hour_bucket_cutoff(hours)]
+    else:
+        query = TOP_SITES_SQL_TS
+        params = [time_cutoff(hours)]
 
     if device_id:
         query += ' AND device_id = ?'
@@ -210,11 +377,12 @@ def view_top_sites(device_id=None, hours=24, limit=20):
     '''
     params.append(limit)
 
+    cursor.arraysize = 1000
     cursor.execute(query, params)
-    results = cursor.fetchall()
-    conn.close()
 
-    if not results:
+    table_data = [[row['url'], row['visit_count']] for row in cursor]
+
+    if not table_data:
         print(f"\n[*] No browsing data found")
         return
 
@@ -222,17 +390,9 @@ def view_top_sites(device_id=None, hours=24, limit=20):
     print(f"TOP VISITED SITES (Last {hours} hours)")
     print(f"{'='*80}\n")
 
-    table_data = []
-    for row in results:
-        table_data.append([
-            row['url'],
-            row['visit_count']
-        ])
-
-    print(tabulate(table_data,
-                  headers=['Website', 'Visits'],
-                  tablefmt='grid',
-                  maxcolwidths=[60, None]))
+    print_table(table_data,
+                headers=['Website', 'Visits'],
+                maxcolwidths=[60, None])
     print()
 
 def view_device_summary(device_id):
@@ -258,22 +418,20 @@ def view_device_summary(device_id):
     print(f"Last Seen: {device['last_seen']}")
     print(f"{'='*80}\n")
 
-    # Count statistics
-    cursor.execute('SELECT COUNT(*) FROM search_queries WHERE device_id = ?', (device_id,))
-    search_count = cursor.fetchone()[0]
-
-    cursor.execute('SELECT COUNT(*) FROM urls_visited WHERE device_id = ?', (device_id,))
-    url_count = cursor.fetchone()[0]
-
-    cursor.execute('SELECT COUNT(*) FROM dns_queries WHERE device_id = ?', (device_id,))
-    dns_count = cursor.fetchone()[0]
+    # Count statistics in one round-trip instead of three
+    cursor.execute('''
+        SELECT
+            (SELECT COUNT(*) FROM search_queries WHERE device_id = ?),
+            (SELECT COUNT(*) FROM urls_visited WHERE device_id = ?),
+            (SELECT COUNT(*) FROM dns_queries WHERE device_id = ?)
+    ''', (device_id, device_id, device_id))
+    search_count, url_count, dns_count = cursor.fetchone()
 
     print(f"Total Search Queries: {search_count}")
     print(f"Total URLs Visited: {url_count}")
     print(f"Total DNS Queries: {dns_count}")
     print()
 
-    conn.close()
 
     # Show recent activity
     view_search_history(device_id, hours=24, limit=10)
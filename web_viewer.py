@@ -4,32 +4,51 @@ Web Interface for Network Activity Monitor
 View device history and DNS queries through a web browser
 """
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, request, Response, stream_with_context
 import sqlite3
+import orjson
+import hashlib
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import os
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # binary responses are opt-in; JSON remains the default
+
 app = Flask(__name__)
 DB_PATH = 'network_activity.db'
 
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-@app.route('/')
-def index():
-    """Main dashboard"""
-    return render_template('index.html')
-
-@app.route('/api/devices')
-def get_devices():
-    """Get all devices"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
+POOL_SIZE = 4
+
+# Pragmas applied once per pooled connection; the monitor owns the single
+# writer, so these connections only ever read. query_only keeps a route
+# from ever taking the write lock; read_uncommitted is safe under WAL
+# snapshots and skips shared-cache table locks
+CONN_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'wal_autocheckpoint=1000',
+    'busy_timeout=5000',
+    'temp_store=MEMORY',
+    'mmap_size=268435456',
+    'cache_size=-65536',
+    'read_uncommitted=1',
+    'query_only=1',
+)
+
+# Static SQL texts; routes execute these by key so each pooled connection's
+# compiled-statement cache is hit instead of re-running sqlite3_prepare_v2
+STMTS = {
+    # Scalar subqueries instead of LEFT JOIN + COUNT(DISTINCT): the join
+    # form materializes queries x connections per device before the
+    # DISTINCT collapses it; each subquery is just an index count
+    'devices': '''
         SELECT
             d.id,
             d.mac_address,
@@ -37,41 +56,12 @@ def get_devices():
             d.hostname,
             d.first_seen,
             d.last_seen,
-            COUNT(DISTINCT dq.id) as query_count,
-            COUNT(DISTINCT c.id) as connection_count
+            (SELECT COUNT(*) FROM dns_queries WHERE device_id = d.id) as query_count,
+            (SELECT COUNT(*) FROM connections WHERE device_id = d.id) as connection_count
         FROM devices d
-        LEFT JOIN dns_queries dq ON d.id = dq.device_id
-        LEFT JOIN connections c ON d.id = c.device_id
-        GROUP BY d.id
         ORDER BY d.last_seen DESC
-    ''')
-
-    devices = []
-    for row in cursor.fetchall():
-        devices.append({
-            'id': row['id'],
-            'mac_address': row['mac_address'],
-            'ip_address': row['ip_address'],
-            'hostname': row['hostname'] or 'Unknown',
-            'first_seen': row['first_seen'],
-            'last_seen': row['last_seen'],
-            'query_count': row['query_count'],
-            'connection_count': row['connection_count']
-        })
-
-    conn.close()
-    return jsonify(devices)
-
-@app.route('/api/device/<int:device_id>/queries')
-def get_device_queries(device_id):
-    """Get DNS queries for a specific device"""
-    hours = request.args.get('hours', 24, type=int)
-    limit = request.args.get('limit', 100, type=int)
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
+    ''',
+    'device_queries': '''
         SELECT
             query_name,
             query_type,
@@ -79,33 +69,11 @@ def get_device_queries(device_id):
             source_ip
         FROM dns_queries
         WHERE device_id = ?
-        AND timestamp >= datetime('now', '-' || ? || ' hours')
+        AND timestamp >= ?
         ORDER BY timestamp DESC
         LIMIT ?
-    ''', (device_id, hours, limit))
-
-    queries = []
-    for row in cursor.fetchall():
-        queries.append({
-            'query_name': row['query_name'],
-            'query_type': row['query_type'],
-            'timestamp': row['timestamp'],
-            'source_ip': row['source_ip']
-        })
-
-    conn.close()
-    return jsonify(queries)
-
-@app.route('/api/device/<int:device_id>/connections')
-def get_device_connections(device_id):
-    """Get connections for a specific device"""
-    hours = request.args.get('hours', 24, type=int)
-    limit = request.args.get('limit', 100, type=int)
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
+    ''',
+    'device_connections': '''
         SELECT
             dest_ip,
             dest_port,
@@ -114,33 +82,14 @@ def get_device_connections(device_id):
             source_ip
         FROM connections
         WHERE device_id = ?
-        AND timestamp >= datetime('now', '-' || ? || ' hours')
+        AND timestamp >= ?
         ORDER BY timestamp DESC
         LIMIT ?
-    ''', (device_id, hours, limit))
-
-    connections = []
-    for row in cursor.fetchall():
-        connections.append({
-            'dest_ip': row['dest_ip'],
-            'dest_port': row['dest_port'],
-            'protocol': row['protocol'],
-            'timestamp': row['timestamp'],
-            'source_ip': row['source_ip']
-        })
-
-    conn.close()
-    return jsonify(connections)
-
-@app.route('/api/recent_activity')
-def get_recent_activity():
-    """Get recent network activity across all devices"""
-    limit = request.args.get('limit', 50, type=int)
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
+    ''',
+    # Keyset pagination: the timestamp bound lets SQLite walk the
+    # timestamp index backwards and stop after LIMIT rows instead of
+    # sorting the whole table
+    'recent_activity': '''
         SELECT
             d.mac_address,
             d.ip_address,
@@ -149,22 +98,459 @@ def get_recent_activity():
             dq.timestamp
         FROM dns_queries dq
         JOIN devices d ON dq.device_id = d.id
+        WHERE dq.timestamp < ?
         ORDER BY dq.timestamp DESC
         LIMIT ?
-    ''', (limit,))
+    ''',
+    'top_queries': '''
+        SELECT
+            query_name,
+            COUNT(*) as count
+        FROM dns_queries
+        WHERE timestamp >= ?
+        GROUP BY query_name
+        ORDER BY count DESC
+        LIMIT ?
+    ''',
+    # No DISTINCT: near-unique timestamps made it pure sort-dedupe
+    # overhead; the route deduplicates in Python and stops at 50 rows
+    'search': '''
+        SELECT
+            d.mac_address,
+            d.ip_address,
+            dq.query_name,
+            dq.timestamp
+        FROM dns_queries dq
+        JOIN devices d ON dq.device_id = d.id
+        WHERE dq.query_name LIKE ?
+        ORDER BY dq.timestamp DESC
+    ''',
+    # Sargable range over idx_dq_name for "domain starts with" searches;
+    # an index seek where leading-wildcard LIKE forces a full scan
+    'search_prefix': '''
+        SELECT
+            d.mac_address,
+            d.ip_address,
+            dq.query_name,
+            dq.timestamp
+        FROM dns_queries dq
+        JOIN devices d ON dq.device_id = d.id
+        WHERE dq.query_name >= ? AND dq.query_name < ?
+        ORDER BY dq.timestamp DESC
+    ''',
+    # Trigram FTS keeps substring semantics but replaces the full-table
+    # LIKE scan with an index probe
+    'search_fts': '''
+        SELECT
+            d.mac_address,
+            d.ip_address,
+            dq.query_name,
+            dq.timestamp
+        FROM dns_queries_fts f
+        JOIN dns_queries dq ON dq.id = f.rowid
+        JOIN devices d ON d.id = dq.device_id
+        WHERE dns_queries_fts MATCH ?
+        ORDER BY dq.timestamp DESC
+    ''',
+    'device_searches': '''
+        SELECT
+            search_engine,
+            query,
+            timestamp,
+            source_ip
+        FROM search_queries
+        WHERE device_id = ?
+        AND timestamp >= ?
+        ORDER BY timestamp DESC
+        LIMIT ?
+    ''',
+    'device_urls': '''
+        SELECT
+            url,
+            full_url,
+            method,
+            status_code,
+            timestamp,
+            source_ip
+        FROM urls_visited
+        WHERE device_id = ?
+        AND timestamp >= ?
+        ORDER BY timestamp DESC
+        LIMIT ?
+    ''',
+    'all_searches': '''
+        SELECT
+            sq.search_engine,
+            sq.query,
+            sq.timestamp,
+            sq.source_ip,
+            d.mac_address,
+            d.hostname
+        FROM search_queries sq
+        LEFT JOIN devices d ON sq.device_id = d.id
+        WHERE sq.timestamp >= ?
+        ORDER BY sq.timestamp DESC
+        LIMIT ?
+    ''',
+    # Whole dashboard payload built inside SQLite: one round-trip, and
+    # the JSON bytes come straight out of json_group_array with no
+    # Python-side dict construction
+    'dashboard': '''
+        SELECT json_object(
+            'devices', (
+                SELECT json_group_array(json_object(
+                    'id', d.id,
+                    'mac_address', d.mac_address,
+                    'ip_address', d.ip_address,
+                    'hostname', COALESCE(d.hostname, 'Unknown'),
+                    'first_seen', d.first_seen,
+                    'last_seen', d.last_seen,
+                    'query_count', (SELECT COUNT(*) FROM dns_queries WHERE device_id = d.id),
+                    'connection_count', (SELECT COUNT(*) FROM connections WHERE device_id = d.id)))
+                FROM (SELECT * FROM devices ORDER BY last_seen DESC) d
+            ),
+            'top_queries', (
+                SELECT json_group_array(json_object('domain', query_name, 'count', cnt))
+                FROM (
+                    SELECT query_name, COUNT(*) as cnt
+                    FROM dns_queries
+                    WHERE timestamp >= ?
+                    GROUP BY query_name
+                    ORDER BY cnt DESC
+                    LIMIT 20
+                )
+            ),
+            'recent_activity', (
+                SELECT json_group_array(json_object(
+                    'mac_address', mac_address,
+                    'ip_address', ip_address,
+                    'activity', activity,
+                    'type', 'DNS',
+                    'timestamp', ts))
+                FROM (
+                    SELECT d.mac_address, d.ip_address, dq.query_name as activity, dq.timestamp as ts
+                    FROM dns_queries dq
+                    JOIN devices d ON dq.device_id = d.id
+                    ORDER BY dq.timestamp DESC
+                    LIMIT 50
+                )
+            )
+        )
+    ''',
+    'top_sites': '''
+        SELECT
+            url,
+            COUNT(*) as count
+        FROM urls_visited
+        WHERE timestamp >= ?
+        GROUP BY url
+        ORDER BY count DESC
+        LIMIT ?
+    ''',
+}
+
+def time_cutoff(hours):
+    """Cutoff timestamp for an hours-ago window, in SQLite's UTC format.
+
+    Binding a plain value keeps `timestamp >= ?` a sargable range the
+    planner can serve from the (device_id, timestamp) indexes, and keeps
+    the statement text static for the compiled-statement cache.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    return cutoff.strftime('%Y-%m-%d %H:%M:%S')
+
+def _new_connection():
+    """Open and configure one long-lived read connection"""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None,
+                           cached_statements=128)
+    for pragma in CONN_PRAGMAS:
+        conn.execute(f'PRAGMA {pragma}')
+    # Default tuple rows: sqlite3.Row's name lookups cost a C-level
+    # search per field in loops that only ever index positionally
+    return conn
+
+# Long-lived connections reused across requests; opening per request
+# re-parses the WAL header and reopens the .db/-wal/-shm files every hit
+_pool = queue.Queue(maxsize=POOL_SIZE)
+
+def _init_pool():
+    while not _pool.full():
+        _pool.put(_new_connection())
+
+# Set when the trigram FTS index over dns_queries is available; /api/search
+# falls back to the LIKE scan without it
+HAS_FTS = False
+
+def _ensure_search_fts():
+    """Build the trigram FTS5 index over dns_queries for /api/search"""
+    global HAS_FTS
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        fresh = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'dns_queries_fts'").fetchone()
+        conn.executescript('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS dns_queries_fts USING fts5(
+                query_name,
+                content='dns_queries',
+                content_rowid='id',
+                tokenize='trigram'
+            );
+            CREATE TRIGGER IF NOT EXISTS trg_dq_fts_ai AFTER INSERT ON dns_queries BEGIN
+                INSERT INTO dns_queries_fts(rowid, query_name)
+                VALUES (NEW.id, NEW.query_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_dq_fts_ad AFTER DELETE ON dns_queries BEGIN
+                INSERT INTO dns_queries_fts(dns_queries_fts, rowid, query_name)
+                VALUES ('delete', OLD.id, OLD.query_name);
+            END;
+        ''')
+        if fresh:
+            # Backfill rows captured before the triggers existed
+            conn.execute("INSERT INTO dns_queries_fts(dns_queries_fts) VALUES ('rebuild')")
+        conn.commit()
+        conn.close()
+        HAS_FTS = True
+    except sqlite3.Error:
+        HAS_FTS = False
+
+# The interception tables are optional and the interceptor is routinely
+# started after the viewer; a positive answer is cached for good, a
+# negative one only for a few seconds so the tables are picked up once
+# the interceptor creates them
+HAS_SEARCH_QUERIES = False
+HAS_URLS_VISITED = False
+TABLE_RECHECK_TTL = 5
+_tables_checked_at = 0.0
+
+def _check_tables():
+    """Refresh the optional-table flags from sqlite_master"""
+    global HAS_SEARCH_QUERIES, HAS_URLS_VISITED, _tables_checked_at
+    _tables_checked_at = time.monotonic()
+    try:
+        conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True)
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        conn.close()
+    except sqlite3.Error:
+        names = set()
+    HAS_SEARCH_QUERIES = 'search_queries' in names
+    HAS_URLS_VISITED = 'urls_visited' in names
+
+def _recheck_if_stale():
+    if time.monotonic() - _tables_checked_at >= TABLE_RECHECK_TTL:
+        _check_tables()
+
+def _search_queries_ready():
+    if not HAS_SEARCH_QUERIES:
+        _recheck_if_stale()
+    return HAS_SEARCH_QUERIES
+
+def _urls_visited_ready():
+    if not HAS_URLS_VISITED:
+        _recheck_if_stale()
+    return HAS_URLS_VISITED
+
+def _ensure_indexes():
+    """Create the composite indexes the API queries lean on.
+
+    Same names as the capture tools use, so IF NOT EXISTS makes this a
+    no-op when the monitor already built them. Uses a short-lived
+    writable connection; the pooled readers never write.
+    """
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        for stmt in (
+            'CREATE INDEX IF NOT EXISTS idx_dns_device_ts ON dns_queries(device_id, timestamp DESC)',
+            'CREATE INDEX IF NOT EXISTS idx_conn_device_ts ON connections(device_id, timestamp DESC)',
+            'CREATE INDEX IF NOT EXISTS idx_dns_timestamp ON dns_queries(timestamp)',
+            'CREATE INDEX IF NOT EXISTS idx_dq_name ON dns_queries(query_name)',
+            'CREATE INDEX IF NOT EXISTS idx_sq_dev_ts ON search_queries(device_id, timestamp DESC)',
+            'CREATE INDEX IF NOT EXISTS idx_uv_dev_ts ON urls_visited(device_id, timestamp DESC)',
+        ):
+            try:
+                conn.execute(stmt)
+            except sqlite3.OperationalError:
+                pass  # optional interception tables may not exist yet
+        conn.execute('ANALYZE')
+        conn.commit()
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+@contextmanager
+def borrow_conn():
+    """Borrow a pooled connection for the duration of a request"""
+    conn = _pool.get()
+    try:
+        yield conn
+    finally:
+        _pool.put(conn)
+
+def stream_json(stmt_key, params, make_row):
+    """Stream a query result as a JSON array, one row at a time.
+
+    Rows flow cursor -> encoder -> socket without ever building the full
+    list in memory, so the first byte goes out after the first row rather
+    than after the whole query.
+    """
+    def generate():
+        with borrow_conn() as conn:
+            cursor = conn.execute(STMTS[stmt_key], params)
+            yield b'['
+            first = True
+            for r in cursor:
+                if first:
+                    first = False
+                else:
+                    yield b','
+                yield orjson.dumps(make_row(r))
+            yield b']'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def ojsonify(obj):
+    """jsonify replacement backed by orjson's C encoder"""
+    return Response(orjson.dumps(obj), mimetype='application/json')
+
+class TTLCache:
+    """Thread-safe cache of encoded response payloads with per-entry TTL.
+
+    The dashboard polls these endpoints every few seconds; a short TTL
+    collapses concurrent polls into one query + one encode.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key, ttl, producer):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+        payload = producer()
+        with self._lock:
+            self._entries[key] = (now + ttl, payload)
+        return payload
+
+_cache = TTLCache()
+CACHE_TTL = 5
+
+def wants_msgpack():
+    """True when the client explicitly prefers application/msgpack.
+
+    Quality comparison instead of best_match: best_match breaks the
+    Accept: */* tie by server-list order and would hand MessagePack to
+    plain fetch()/curl clients expecting JSON. JSON wins ties; msgpack
+    only on a higher explicit quality.
+    """
+    if msgpack is None:
+        return False
+    accept = request.accept_mimetypes
+    return accept['application/msgpack'] > accept['application/json']
+
+def msgpack_response(cols, rows):
+    """Column-oriented MessagePack payload: field names sent once, not per row"""
+    payload = msgpack.packb({'cols': cols, 'rows': rows}, use_bin_type=True)
+    return Response(payload, mimetype='application/msgpack')
+
+def cached_response(key, producer):
+    """Serve a TTL-cached payload, honouring If-None-Match revalidation.
+
+    Polling clients that already hold the current payload get an empty
+    304 instead of the body; the ETag is a short hash of the encoded
+    bytes, so it changes exactly when the payload does.
+    """
+    payload = _cache.get(key, CACHE_TTL, producer)
+    etag = hashlib.blake2b(payload, digest_size=8).hexdigest()
+    if request.headers.get('If-None-Match') == etag:
+        resp = Response(status=304)
+    else:
+        resp = Response(payload, mimetype='application/json')
+    resp.headers['ETag'] = etag
+    resp.headers['Cache-Control'] = 'max-age=5, must-revalidate'
+    return resp
 
-    activities = []
-    for row in cursor.fetchall():
-        activities.append({
-            'mac_address': row['mac_address'],
-            'ip_address': row['ip_address'],
-            'activity': row['activity'],
-            'type': row['type'],
-            'timestamp': row['timestamp']
-        })
+@app.route('/')
+def index():
+    """Main dashboard"""
+    return render_template('index.html')
 
-    conn.close()
-    return jsonify(activities)
+def _build_devices():
+    # Cached responses have to be whole payloads, so this endpoint
+    # materializes instead of streaming
+    with borrow_conn() as conn:
+        rows = conn.execute(STMTS['devices']).fetchall()
+    return orjson.dumps([{
+        'id': r[0],
+        'mac_address': r[1],
+        'ip_address': r[2],
+        'hostname': r[3] or 'Unknown',
+        'first_seen': r[4],
+        'last_seen': r[5],
+        'query_count': r[6],
+        'connection_count': r[7]
+    } for r in rows])
+
+@app.route('/api/devices')
+def get_devices():
+    """Get all devices"""
+    if wants_msgpack():
+        with borrow_conn() as conn:
+            rows = [[r[0], r[1], r[2], r[3] or 'Unknown', r[4], r[5], r[6], r[7]]
+                    for r in conn.execute(STMTS['devices'])]
+        return msgpack_response(
+            ['id', 'mac_address', 'ip_address', 'hostname', 'first_seen',
+             'last_seen', 'query_count', 'connection_count'], rows)
+    return cached_response('devices', _build_devices)
+
+@app.route('/api/device/<int:device_id>/queries')
+def get_device_queries(device_id):
+    """Get DNS queries for a specific device"""
+    hours = request.args.get('hours', 24, type=int)
+    limit = request.args.get('limit', 100, type=int)
+
+    return stream_json('device_queries', (device_id, time_cutoff(hours), limit), lambda r: {
+        'query_name': r[0],
+        'query_type': r[1],
+        'timestamp': r[2],
+        'source_ip': r[3]
+    })
+
+@app.route('/api/device/<int:device_id>/connections')
+def get_device_connections(device_id):
+    """Get connections for a specific device"""
+    hours = request.args.get('hours', 24, type=int)
+    limit = request.args.get('limit', 100, type=int)
+
+    return stream_json('device_connections', (device_id, time_cutoff(hours), limit), lambda r: {
+        'dest_ip': r[0],
+        'dest_port': r[1],
+        'protocol': r[2],
+        'timestamp': r[3],
+        'source_ip': r[4]
+    })
+
+@app.route('/api/recent_activity')
+def get_recent_activity():
+    """Get recent network activity across all devices"""
+    limit = request.args.get('limit', 50, type=int)
+    # Pass the oldest timestamp from the previous page to fetch the next one
+    before_ts = request.args.get('before_ts', '')
+
+    if wants_msgpack():
+        with borrow_conn() as conn:
+            rows = [list(r) for r in
+                    conn.execute(STMTS['recent_activity'], (before_ts or '9999', limit))]
+        return msgpack_response(
+            ['mac_address', 'ip_address', 'activity', 'type', 'timestamp'], rows)
+
+    return stream_json('recent_activity', (before_ts or '9999', limit), lambda r: {
+        'mac_address': r[0],
+        'ip_address': r[1],
+        'activity': r[2],
+        'type': r[3],
+        'timestamp': r[4]
+    })
 
 @app.route('/api/top_queries')
 def get_top_queries():
@@ -172,29 +558,12 @@ def get_top_queries():
     hours = request.args.get('hours', 24, type=int)
     limit = request.args.get('limit', 20, type=int)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        SELECT
-            query_name,
-            COUNT(*) as count
-        FROM dns_queries
-        WHERE timestamp >= datetime('now', '-' || ? || ' hours')
-        GROUP BY query_name
-        ORDER BY count DESC
-        LIMIT ?
-    ''', (hours, limit))
-
-    queries = []
-    for row in cursor.fetchall():
-        queries.append({
-            'domain': row['query_name'],
-            'count': row['count']
-        })
+    def produce():
+        with borrow_conn() as conn:
+            rows = conn.execute(STMTS['top_queries'], (time_cutoff(hours), limit)).fetchall()
+        return orjson.dumps([{'domain': r[0], 'count': r[1]} for r in rows])
 
-    conn.close()
-    return jsonify(queries)
+    return cached_response(('top_queries', hours, limit), produce)
 
 @app.route('/api/search')
 def search():
@@ -202,35 +571,50 @@ def search():
     query = request.args.get('q', '')
 
     if not query:
-        return jsonify([])
+        return ojsonify([])
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        SELECT DISTINCT
-            d.mac_address,
-            d.ip_address,
-            dq.query_name,
-            dq.timestamp
-        FROM dns_queries dq
-        JOIN devices d ON dq.device_id = d.id
-        WHERE dq.query_name LIKE ?
-        ORDER BY dq.timestamp DESC
-        LIMIT 50
-    ''', (f'%{query}%',))
+    # A leading * asks for an explicit substring match
+    explicit_substring = query.startswith('*')
+    term = query.lstrip('*')
+    if not term:
+        return ojsonify([])
 
     results = []
-    for row in cursor.fetchall():
-        results.append({
-            'mac_address': row['mac_address'],
-            'ip_address': row['ip_address'],
-            'query_name': row['query_name'],
-            'timestamp': row['timestamp']
-        })
-
-    conn.close()
-    return jsonify(results)
+    seen = set()
+
+    def collect(cursor):
+        # Dedupe on (device, domain) as rows stream in and stop at 50;
+        # the cursor never fetches past the break
+        for r in cursor:
+            key = (r[0], r[2])
+            if key in seen:
+                continue
+            seen.add(key)
+            results.append({
+                'mac_address': r[0],
+                'ip_address': r[1],
+                'query_name': r[2],
+                'timestamp': r[3]
+            })
+            if len(results) == 50:
+                break
+
+    with borrow_conn() as conn:
+        if HAS_FTS and len(term) >= 3:
+            # Quote the term so it is matched literally, not parsed as
+            # FTS query syntax; trigram needs at least 3 characters
+            match = '"' + term.replace('"', '""') + '"'
+            collect(conn.execute(STMTS['search_fts'], (match,)))
+        elif explicit_substring:
+            collect(conn.execute(STMTS['search'], (f'%{term}%',)))
+        else:
+            # Index range seek for the common "domain starts with" case;
+            # the substring scan only runs when the prefix finds nothing
+            collect(conn.execute(STMTS['search_prefix'], (term, term + '\uffff')))
+            if not results:
+                collect(conn.execute(STMTS['search'], (f'%{term}%',)))
+
+    return ojsonify(results)
 
 @app.route('/api/device/<int:device_id>/searches')
 def get_device_searches(device_id):
@@ -238,39 +622,24 @@ def get_device_searches(device_id):
     hours = request.args.get('hours', 24, type=int)
     limit = request.args.get('limit', 100, type=int)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if not _search_queries_ready():
+        return ojsonify([])
 
-    # Check if table exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='search_queries'")
-    if not cursor.fetchone():
-        conn.close()
-        return jsonify([])
+    with borrow_conn() as conn:
+        try:
+            cursor = conn.execute(STMTS['device_searches'], (device_id, time_cutoff(hours), limit))
+        except sqlite3.OperationalError:
+            _check_tables()
+            return ojsonify([])
 
-    cursor.execute('''
-        SELECT
-            search_engine,
-            query,
-            timestamp,
-            source_ip
-        FROM search_queries
-        WHERE device_id = ?
-        AND timestamp >= datetime('now', '-' || ? || ' hours')
-        ORDER BY timestamp DESC
-        LIMIT ?
-    ''', (device_id, hours, limit))
+        searches = [{
+            'search_engine': r[0],
+            'query': r[1],
+            'timestamp': r[2],
+            'source_ip': r[3]
+        } for r in cursor.fetchall()]
 
-    searches = []
-    for row in cursor.fetchall():
-        searches.append({
-            'search_engine': row['search_engine'],
-            'query': row['query'],
-            'timestamp': row['timestamp'],
-            'source_ip': row['source_ip']
-        })
-
-    conn.close()
-    return jsonify(searches)
+    return ojsonify(searches)
 
 @app.route('/api/device/<int:device_id>/urls')
 def get_device_urls(device_id):
@@ -278,43 +647,90 @@ def get_device_urls(device_id):
     hours = request.args.get('hours', 24, type=int)
     limit = request.args.get('limit', 100, type=int)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if not _urls_visited_ready():
+        return ojsonify([])
+
+    with borrow_conn() as conn:
+        try:
+            cursor = conn.execute(STMTS['device_urls'], (device_id, time_cutoff(hours), limit))
+        except sqlite3.OperationalError:
+            _check_tables()
+            return ojsonify([])
+
+        urls = [{
+            'url': r[0],
+            'full_url': r[1],
+            'method': r[2],
+            'status_code': r[3],
+            'timestamp': r[4],
+            'source_ip': r[5]
+        } for r in cursor.fetchall()]
+
+    return ojsonify(urls)
+
+@app.route('/api/dashboard')
+def get_dashboard():
+    """Get devices, top queries and recent activity in a single query"""
+    hours = request.args.get('hours', 24, type=int)
 
-    # Check if table exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='urls_visited'")
-    if not cursor.fetchone():
-        conn.close()
-        return jsonify([])
+    with borrow_conn() as conn:
+        row = conn.execute(STMTS['dashboard'], (time_cutoff(hours),)).fetchone()
 
-    cursor.execute('''
-        SELECT
-            url,
-            full_url,
-            method,
-            status_code,
-            timestamp,
-            source_ip
-        FROM urls_visited
-        WHERE device_id = ?
-        AND timestamp >= datetime('now', '-' || ? || ' hours')
-        ORDER BY timestamp DESC
-        LIMIT ?
-    ''', (device_id, hours, limit))
-
-    urls = []
-    for row in cursor.fetchall():
-        urls.append({
-            'url': row['url'],
-            'full_url': row['full_url'],
-            'method': row['method'],
-            'status_code': row['status_code'],
-            'timestamp': row['timestamp'],
-            'source_ip': row['source_ip']
-        })
-
-    conn.close()
-    return jsonify(urls)
+    return Response(row[0], mimetype='application/json')
+
+@app.route('/api/device/<int:device_id>/summary')
+def get_device_summary(device_id):
+    """Get queries, connections, searches and URLs for a device in one call
+
+    One borrow and one HTTP round-trip instead of four; the dashboard
+    fetches all four panels for the same device together anyway.
+    """
+    hours = request.args.get('hours', 24, type=int)
+    limit = request.args.get('limit', 100, type=int)
+    params = (device_id, time_cutoff(hours), limit)
+
+    with borrow_conn() as conn:
+        queries = [{
+            'query_name': r[0],
+            'query_type': r[1],
+            'timestamp': r[2],
+            'source_ip': r[3]
+        } for r in conn.execute(STMTS['device_queries'], params)]
+
+        connections = [{
+            'dest_ip': r[0],
+            'dest_port': r[1],
+            'protocol': r[2],
+            'timestamp': r[3],
+            'source_ip': r[4]
+        } for r in conn.execute(STMTS['device_connections'], params)]
+
+        searches = []
+        if _search_queries_ready():
+            searches = [{
+                'search_engine': r[0],
+                'query': r[1],
+                'timestamp': r[2],
+                'source_ip': r[3]
+            } for r in conn.execute(STMTS['device_searches'], params)]
+
+        urls = []
+        if _urls_visited_ready():
+            urls = [{
+                'url': r[0],
+                'full_url': r[1],
+                'method': r[2],
+                'status_code': r[3],
+                'timestamp': r[4],
+                'source_ip': r[5]
+            } for r in conn.execute(STMTS['device_urls'], params)]
+
+    return ojsonify({
+        'queries': queries,
+        'connections': connections,
+        'searches': searches,
+        'urls': urls
+    })
 
 @app.route('/api/all_searches')
 def get_all_searches():
@@ -322,42 +738,25 @@ def get_all_searches():
     hours = request.args.get('hours', 24, type=int)
     limit = request.args.get('limit', 50, type=int)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Check if table exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='search_queries'")
-    if not cursor.fetchone():
-        conn.close()
-        return jsonify([])
+    if not _search_queries_ready():
+        return ojsonify([])
 
-    cursor.execute('''
-        SELECT
-            sq.search_engine,
-            sq.query,
-            sq.timestamp,
-            sq.source_ip,
-            d.mac_address,
-            d.hostname
-        FROM search_queries sq
-        LEFT JOIN devices d ON sq.device_id = d.id
-        WHERE sq.timestamp >= datetime('now', '-' || ? || ' hours')
-        ORDER BY sq.timestamp DESC
-        LIMIT ?
-    ''', (hours, limit))
+    with borrow_conn() as conn:
+        try:
+            cursor = conn.execute(STMTS['all_searches'], (time_cutoff(hours), limit))
+        except sqlite3.OperationalError:
+            _check_tables()
+            return ojsonify([])
 
-    searches = []
-    for row in cursor.fetchall():
-        searches.append({
-            'search_engine': row['search_engine'],
-            'query': row['query'],
-            'timestamp': row['timestamp'],
-            'source_ip': row['source_ip'],
-            'device': row['hostname'] or row['mac_address']
-        })
+        searches = [{
+            'search_engine': r[0],
+            'query': r[1],
+            'timestamp': r[2],
+            'source_ip': r[3],
+            'device': r[5] or r[4]
+        } for r in cursor.fetchall()]
 
-    conn.close()
-    return jsonify(searches)
+    return ojsonify(searches)
 
 @app.route('/api/top_sites')
 def get_top_sites():
@@ -365,35 +764,19 @@ def get_top_sites():
     hours = request.args.get('hours', 24, type=int)
     limit = request.args.get('limit', 20, type=int)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if not _urls_visited_ready():
+        return ojsonify([])
 
-    # Check if table exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='urls_visited'")
-    if not cursor.fetchone():
-        conn.close()
-        return jsonify([])
+    def produce():
+        with borrow_conn() as conn:
+            try:
+                cursor = conn.execute(STMTS['top_sites'], (time_cutoff(hours), limit))
+            except sqlite3.OperationalError:
+                _check_tables()
+                return orjson.dumps([])
+            return orjson.dumps([{'url': r[0], 'count': r[1]} for r in cursor.fetchall()])
 
-    cursor.execute('''
-        SELECT
-            url,
-            COUNT(*) as count
-        FROM urls_visited
-        WHERE timestamp >= datetime('now', '-' || ? || ' hours')
-        GROUP BY url
-        ORDER BY count DESC
-        LIMIT ?
-    ''', (hours, limit))
-
-    sites = []
-    for row in cursor.fetchall():
-        sites.append({
-            'url': row['url'],
-            'count': row['count']
-        })
-
-    conn.close()
-    return jsonify(sites)
+    return cached_response(('top_sites', hours, limit), produce)
 
 if __name__ == '__main__':
     if not os.path.exists(DB_PATH):
@@ -401,6 +784,11 @@ if __name__ == '__main__':
         print("[!] Please run network_monitor.py first to create the database")
         exit(1)
 
+    _ensure_indexes()
+    _ensure_search_fts()
+    _check_tables()
+    _init_pool()
+
     print("""
     ╔═══════════════════════════════════════════════════════════╗
     ║         Network Activity Web Viewer                       ║
@@ -411,4 +799,7 @@ if __name__ == '__main__':
     [*] Press Ctrl+C to stop
     """)
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # No debugger/reloader overhead, and skip the per-request access log;
+    # threaded so one slow request doesn't serialize the rest
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    app.run(debug=False, threaded=True, host='0.0.0.0', port=5000)
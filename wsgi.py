@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for the web viewer
+
+Run under a production server instead of the Werkzeug dev server:
+
+    gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:5000 wsgi:app
+
+Each worker gets its own connection pool; WAL lets all of them read
+while network_monitor.py keeps writing.
+"""
+
+from web_viewer import app, _ensure_indexes, _ensure_search_fts, _check_tables, _init_pool
+
+_ensure_indexes()
+_ensure_search_fts()
+_check_tables()
+_init_pool()